@@ -1,10 +1,26 @@
 # backend/app/api/routes/actions.py
-from fastapi import APIRouter, HTTPException, Query
-from app.core.trino_client import get_trino_connection, TRINO_SERVERS
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.core.trino_client import TRINO_SERVERS, pooled_connection, query_progress
+from app.core.executor import run_trino
+from app.core.maintenance import MAINTENANCE_ACTIONS, action_query, execute_action
+from app.api.routes.manifests import load_manifest_report
+from app.core.optimize_planner import (
+    SMART_OPTIMIZE_BYTE_BUDGET_GB,
+    SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB,
+    SMART_OPTIMIZE_MIN_SMALL_FILES,
+    plan_smart_optimize,
+)
 from trino.exceptions import TrinoUserError
 
 router = APIRouter()
 
+STREAM_POLL_INTERVAL = 1.0
+
 
 def run_action_query(server, catalog, schema, table, query):
     trino_server = TRINO_SERVERS.get(server)
@@ -12,42 +28,23 @@ def run_action_query(server, catalog, schema, table, query):
         raise HTTPException(status_code=404, detail="Trino server not found")
 
     try:
-        conn = get_trino_connection(
-            host=trino_server["host"],
-            port=trino_server["port"],
-            user=trino_server["user"],
-            catalog=catalog,
-            schema=schema
-        )
-        cursor = conn.cursor()
-        cursor.execute(query)
-        result = cursor.fetchone()
-        return result if result else True
+        return execute_action(server, trino_server, catalog, schema, table, query)
     except TrinoUserError as e:
-        if "PROCEDURE_NOT_FOUND" in str(e):
-            return "PROCEDURE_NOT_FOUND"
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/actions/expire-snapshots", tags=["Actions"])
-def expire_snapshots(
+async def expire_snapshots(
     server: str = Query(...),
     catalog: str = Query(...),
     schema: str = Query(...),
     table: str = Query(...),
     older_than: int = Query(...)
 ):
-    query = f"""
-        CALL system.expire_snapshots(
-            '{catalog}',
-            '{schema}',
-            '{table}',
-            TIMESTAMP 'now' - INTERVAL '{older_than}' day
-        )
-    """
-    result = run_action_query(server, catalog, schema, table, query)
+    query = action_query("expire_snapshots", catalog, schema, table, older_than=older_than)
+    result = await run_trino(server, run_action_query, server, catalog, schema, table, query, heavy=True)
 
     if result == "PROCEDURE_NOT_FOUND":
         return {
@@ -56,19 +53,19 @@ def expire_snapshots(
         }
 
     return {
-        "expired_snapshots": result[0] if result and isinstance(result, tuple) else 0
+        "expired_snapshots": result[0] if result and isinstance(result, (list, tuple)) else 0
     }
 
 
 @router.post("/actions/remove-orphans", tags=["Actions"])
-def remove_orphan_files(
+async def remove_orphan_files(
     server: str = Query(...),
     catalog: str = Query(...),
     schema: str = Query(...),
     table: str = Query(...)
 ):
-    query = f"CALL system.remove_orphan_files('{catalog}.{schema}.{table}')"
-    result = run_action_query(server, catalog, schema, table, query)
+    query = action_query("remove_orphan_files", catalog, schema, table)
+    result = await run_trino(server, run_action_query, server, catalog, schema, table, query, heavy=True)
 
     if result == "PROCEDURE_NOT_FOUND":
         return {
@@ -84,14 +81,14 @@ def remove_orphan_files(
 
 
 @router.post("/actions/optimize", tags=["Actions"])
-def optimize_table(
+async def optimize_table(
     server: str = Query(...),
     catalog: str = Query(...),
     schema: str = Query(...),
     table: str = Query(...)
 ):
-    query = f"CALL system.optimize('{catalog}.{schema}.{table}')"
-    result = run_action_query(server, catalog, schema, table, query)
+    query = action_query("optimize", catalog, schema, table)
+    result = await run_trino(server, run_action_query, server, catalog, schema, table, query, heavy=True)
 
     if result == "PROCEDURE_NOT_FOUND":
         return {
@@ -104,3 +101,191 @@ def optimize_table(
         "status": "success",
         "action": "optimize"
     }
+
+
+@router.post("/actions/rewrite-manifests", tags=["Actions"])
+async def rewrite_manifests(
+    server: str = Query(...),
+    catalog: str = Query(...),
+    schema: str = Query(...),
+    table: str = Query(...),
+    only_if_bloated: bool = Query(False, description="Skip tables whose manifests are not flagged")
+):
+    """Merge small manifests (Trino's ``optimize_manifests`` table procedure).
+
+    Returns the manifest summary and health flags from before and after
+    the rewrite.
+    """
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+
+    before = await run_trino(server, load_manifest_report, trino_server, catalog, schema, table, 0)
+    if only_if_bloated and not before["health"]["bloated"]:
+        return {
+            "status": "skipped",
+            "action": "rewrite_manifests",
+            "note": "manifests are not bloated",
+            "before": {"summary": before["summary"], "health": before["health"]}
+        }
+
+    query = action_query("rewrite_manifests", catalog, schema, table)
+    result = await run_trino(server, run_action_query, server, catalog, schema, table, query, heavy=True)
+
+    if result == "PROCEDURE_NOT_FOUND":
+        return {
+            "status": "skipped",
+            "action": "rewrite_manifests",
+            "note": "optimize_manifests not supported by this Trino version or not an Iceberg table",
+            "before": {"summary": before["summary"], "health": before["health"]}
+        }
+
+    after = await run_trino(server, load_manifest_report, trino_server, catalog, schema, table, 0)
+    return {
+        "status": "success",
+        "action": "rewrite_manifests",
+        "before": {"summary": before["summary"], "health": before["health"]},
+        "after": {"summary": after["summary"], "health": after["health"]}
+    }
+
+
+def run_smart_optimize(server, catalog, schema, table, file_size_threshold_mb, byte_budget_gb,
+                       min_small_files, dry_run):
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+
+    try:
+        with pooled_connection(trino_server, catalog, schema) as conn:
+            plan = plan_smart_optimize(
+                conn.cursor(), catalog, schema, table,
+                file_size_threshold_mb=file_size_threshold_mb,
+                byte_budget_gb=byte_budget_gb,
+                min_small_files=min_small_files
+            )
+    except TrinoUserError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    plan["dry_run"] = dry_run
+    if dry_run:
+        return plan
+
+    for entry in plan["planned"]:
+        try:
+            result = execute_action(server, trino_server, catalog, schema, table, entry["statement"])
+            entry["status"] = "skipped" if result == "PROCEDURE_NOT_FOUND" else "success"
+        except Exception as e:
+            print(f"[WARN] Smart optimize failed for {entry['partition']}: {e}")
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+    return plan
+
+
+@router.post("/actions/smart-optimize", tags=["Actions"])
+async def smart_optimize_table(
+    server: str = Query(...),
+    catalog: str = Query(...),
+    schema: str = Query(...),
+    table: str = Query(...),
+    file_size_threshold_mb: int = Query(SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB, ge=1),
+    byte_budget_gb: float = Query(SMART_OPTIMIZE_BYTE_BUDGET_GB, gt=0),
+    min_small_files: int = Query(SMART_OPTIMIZE_MIN_SMALL_FILES, ge=1),
+    dry_run: bool = Query(True)
+):
+    """Compact only the partitions with the most small and delete files.
+
+    Partitions are scored from $files and optimized worst-first until the
+    byte budget is used up. With dry_run (the default) only the plan is
+    returned.
+    """
+    return await run_trino(
+        server, run_smart_optimize, server, catalog, schema, table,
+        file_size_threshold_mb, byte_budget_gb, min_small_files, dry_run,
+        heavy=not dry_run
+    )
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/actions/stream", tags=["Actions"])
+async def stream_action(
+    request: Request,
+    action: str = Query(..., description="expire_snapshots | remove_orphan_files | optimize | rewrite_manifests"),
+    server: str = Query(...),
+    catalog: str = Query(...),
+    schema: str = Query(...),
+    table: str = Query(...),
+    older_than: int = Query(7),
+    interval: float = Query(STREAM_POLL_INTERVAL, ge=0.2, le=30)
+):
+    """Run a maintenance action and stream its progress as Server-Sent Events.
+
+    Emits ``progress`` events (query id, state, elapsed time, splits and
+    bytes processed) every ``interval`` seconds, then a single ``result`` or
+    ``error`` event. Disconnecting cancels the Trino query.
+    """
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+    if action not in MAINTENANCE_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"action must be one of {', '.join(MAINTENANCE_ACTIONS)}")
+
+    query = action_query(action, catalog, schema, table, older_than=older_than)
+
+    async def events():
+        holder = {}
+        started = time.monotonic()
+
+        def cancel_query():
+            cursor = holder.get("cursor")
+            if cursor is not None and not task.done():
+                print(f"[INFO] Client left, cancelling {action} on {catalog}.{schema}.{table}")
+                try:
+                    cursor.cancel()
+                except Exception as e:
+                    print(f"[WARN] Failed to cancel {action} query: {e}")
+
+        task = asyncio.ensure_future(run_trino(
+            server, execute_action, server, trino_server, catalog, schema, table, query,
+            on_cursor=lambda cursor: holder.update(cursor=cursor), heavy=True
+        ))
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=interval)
+                if task.done():
+                    break
+                if await request.is_disconnected():
+                    cancel_query()
+                    return
+                progress = query_progress(holder["cursor"]) if "cursor" in holder else {"state": "QUEUED"}
+                if progress.get("elapsed_ms") is None:
+                    progress["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+                yield sse_event("progress", {"action": action, **progress})
+
+            try:
+                result = task.result()
+            except Exception as e:
+                yield sse_event("error", {"action": action, "detail": str(e)})
+                return
+
+            final = query_progress(holder["cursor"]) if "cursor" in holder else {}
+            yield sse_event("result", {
+                "action": action,
+                "status": "skipped" if result == "PROCEDURE_NOT_FOUND" else "success",
+                "result": result[0] if isinstance(result, (list, tuple)) and result else None,
+                "query_id": final.get("query_id"),
+                "elapsed_ms": round((time.monotonic() - started) * 1000)
+            })
+        except (asyncio.CancelledError, GeneratorExit):
+            cancel_query()
+            raise
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from app.core.cache import metadata_cache
+
+router = APIRouter()
+
+
+@router.get("/cache/stats", tags=["Cache"])
+def get_cache_stats():
+    return metadata_cache.stats()
+
+
+@router.post("/cache/clear", tags=["Cache"])
+def clear_cache():
+    metadata_cache.clear()
+    return {"status": "cleared"}
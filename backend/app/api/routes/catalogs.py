@@ -1,43 +1,89 @@
 from fastapi import APIRouter, HTTPException, Query
-from app.core.trino_client import TRINO_SERVERS, get_trino_connection
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.core.trino_client import TRINO_SERVERS, pooled_connection
+from app.core.cache import metadata_cache
+from app.core.deadlines import (
+    DEADLINE,
+    TRINO_CANCEL_GRACE,
+    QueryCancelled,
+    QueryScope,
+    current_scope,
+    statement_deadline,
+    use_scope,
+)
+from app.core.executor import run_trino
+from app.core.singleflight import single_flight
+from concurrent.futures import ThreadPoolExecutor, wait
+from trino.exceptions import TrinoUserError
+import contextvars
+import os
 import traceback
 
 router = APIRouter()
 
+CATALOG_FANOUT_WORKERS = int(os.getenv("CATALOG_FANOUT_WORKERS", 4))
+CATALOG_FANOUT_TIMEOUT = float(os.getenv("CATALOG_FANOUT_TIMEOUT", 15))
+
+
+def aggregate_catalogs(cursor):
+    """Schema and table counts for every catalog from the system.jdbc tables."""
+    cursor.execute('''
+        SELECT
+            c.catalog_name,
+            COALESCE(s.schema_count, 0),
+            COALESCE(t.table_count, 0)
+        FROM system.metadata.catalogs c
+        LEFT JOIN (
+            SELECT table_catalog, COUNT(*) AS schema_count
+            FROM system.jdbc.schemas
+            GROUP BY table_catalog
+        ) s ON s.table_catalog = c.catalog_name
+        LEFT JOIN (
+            SELECT table_cat, COUNT(*) AS table_count
+            FROM system.jdbc.tables
+            GROUP BY table_cat
+        ) t ON t.table_cat = c.catalog_name
+        ORDER BY c.catalog_name
+    ''')
+    return [
+        {
+            "name": name,
+            "tables": table_count,
+            "schemas": schema_count,
+            "description": "Catalog fetched successfully"
+        }
+        for name, schema_count, table_count in cursor.fetchall()
+    ]
+
+
 def enrich_catalog(catalog_name, server_info):
     table_count, schema_count = 0, 0
     try:
-        conn_catalog = get_trino_connection(
-            host=server_info["host"],
-            port=server_info["port"], 
-            user=server_info["user"],
-            catalog=catalog_name,
-            schema="information_schema"
-        )
-        cursor = conn_catalog.cursor()
-
-        # Table count
-        try:
-            cursor.execute("SELECT COUNT(*) FROM information_schema.tables")
-            table_count = cursor.fetchone()[0]
-        except Exception as e:
-            print(f"[WARN] Failed to count tables in {catalog_name}: {e}")
-
-        # Schema count
-        try:
-            cursor.execute("SELECT COUNT(*) FROM information_schema.schemata")
-            schema_count = cursor.fetchone()[0]
-        except Exception as e:
-            print(f"[WARN] Failed to count schemas in {catalog_name}: {e}")
+        with pooled_connection(server_info, catalog_name, "information_schema") as conn_catalog:
+            cursor = conn_catalog.cursor()
+
+            # Table count
+            try:
+                cursor.execute("SELECT COUNT(*) FROM information_schema.tables")
+                table_count = cursor.fetchone()[0]
+            except TrinoUserError as e:
+                print(f"[WARN] Failed to count tables in {catalog_name}: {e}")
+
+            # Schema count
+            try:
+                cursor.execute("SELECT COUNT(*) FROM information_schema.schemata")
+                schema_count = cursor.fetchone()[0]
+            except TrinoUserError as e:
+                print(f"[WARN] Failed to count schemas in {catalog_name}: {e}")
 
         return {
             "name": catalog_name,
             "tables": table_count,
             "schemas": schema_count,
             "description": "Catalog fetched successfully"
-        } 
+        }
 
+    except QueryCancelled:
+        raise
     except Exception as e:
         print(f"[ERROR] Error enriching {catalog_name}: {e}")
         traceback.print_exc()
@@ -48,38 +94,116 @@ def enrich_catalog(catalog_name, server_info):
             "description": "N/A"
         }
 
-@router.get("/catalogs", tags=["Catalogs"])
-def fetch_catalogs(server: str = Query(...)):
-    print(f"[INFO] Fetching catalogs for server: {server}")
-    server_info = TRINO_SERVERS.get(server)
-    if not server_info:
-        raise HTTPException(status_code=404, detail="Server not found")
 
+def fanout_catalogs(catalog_names, server_info, timeout=CATALOG_FANOUT_TIMEOUT):
+    """Per-catalog fallback, bounded in workers and in wall-clock time per catalog.
+
+    Each catalog's statements share a deadline of ``timeout`` seconds from
+    when its worker picks it up, and run in their own QueryScope so a
+    catalog that overruns is cancelled and reported on its own.
+    """
+    if not catalog_names:
+        return []
+
+    request_scope = current_scope()
+    scopes = {name: QueryScope() for name in catalog_names}
+    if request_scope is not None:
+        for scope in scopes.values():
+            request_scope.on_cancel(scope.cancel_all)
+
+    def run(name):
+        use_scope(scopes[name])
+        with statement_deadline(timeout):
+            return enrich_catalog(name, server_info)
+
+    executor = ThreadPoolExecutor(max_workers=min(CATALOG_FANOUT_WORKERS, len(catalog_names)))
     try:
-        conn = get_trino_connection(
-            host=server_info["host"],
-            port=server_info["port"],
-            user=server_info["user"],
-            catalog="system",
-            schema="information_schema"
-        )
-        cursor = conn.cursor()
-        cursor.execute("SHOW CATALOGS")
-        catalog_names = [row[0] for row in cursor.fetchall()]
-        print(f"[INFO] Found {len(catalog_names)} catalogs")
+        # Workers inherit the request context (lane, trace) of the caller
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, run, name)
+            for name in catalog_names
+        }
+        # Backstop for workers stuck outside a statement (e.g. waiting for a
+        # pooled connection); catalogs run in batches of CATALOG_FANOUT_WORKERS
+        rounds = -(-len(catalog_names) // CATALOG_FANOUT_WORKERS)
+        wait(futures.values(), timeout=(timeout + TRINO_CANCEL_GRACE) * rounds + TRINO_CANCEL_GRACE)
 
         enriched_catalogs = []
-        with ThreadPoolExecutor(max_workers=min(10, len(catalog_names))) as executor:
-            futures = [executor.submit(enrich_catalog, name, server_info) for name in catalog_names]
-            for future in as_completed(futures):
+        for name, future in futures.items():
+            timed_out = not future.done()
+            if timed_out:
+                print(f"[WARN] Timed out enriching {name}, cancelling")
+                future.cancel()
+                scopes[name].cancel_all(DEADLINE)
+            elif not future.cancelled():
                 try:
                     enriched_catalogs.append(future.result())
+                    continue
+                except QueryCancelled as e:
+                    if e.reason != DEADLINE:
+                        raise
+                    print(f"[WARN] Timed out enriching {name}")
+                    timed_out = True
                 except Exception as e:
                     print(f"[ERROR] Thread failed: {e}")
                     traceback.print_exc()
-
+            if timed_out and request_scope is not None:
+                # Keeps the partial listing out of the cache
+                request_scope.record(DEADLINE)
+            enriched_catalogs.append({
+                "name": name,
+                "tables": 0,
+                "schemas": 0,
+                "description": "Timed out" if timed_out else "N/A"
+            })
         return enriched_catalogs
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@router.get("/catalogs", tags=["Catalogs"])
+async def fetch_catalogs(
+    server: str = Query(...),
+    mode: str = Query("aggregate", description="aggregate | fanout")
+):
+    print(f"[INFO] Fetching catalogs for server: {server}")
+    server_info = TRINO_SERVERS.get(server)
+    if not server_info:
+        raise HTTPException(status_code=404, detail="Server not found")
+    if mode not in ("aggregate", "fanout"):
+        raise HTTPException(status_code=400, detail="mode must be one of aggregate, fanout")
+
+    def load():
+        return metadata_cache.get_or_load("catalogs", (server, mode), lambda: load_catalogs(server_info, mode))
+
+    return await single_flight.do(
+        "catalogs",
+        (server, mode),
+        lambda: run_trino(server, load)
+    )
+
+
+def load_catalogs(server_info, mode):
+    try:
+        with pooled_connection(server_info, "system", "information_schema") as conn:
+            cursor = conn.cursor()
+            if mode == "aggregate":
+                try:
+                    return aggregate_catalogs(cursor)
+                except QueryCancelled:
+                    # Out of time (or the client left): a fan-out would not finish either
+                    raise
+                except Exception as e:
+                    print(f"[WARN] Aggregate catalog listing failed, falling back to fan-out: {e}")
+
+            cursor.execute("SHOW CATALOGS")
+            catalog_names = [row[0] for row in cursor.fetchall()]
+        print(f"[INFO] Found {len(catalog_names)} catalogs")
+
+        return fanout_catalogs(catalog_names, server_info)
 
+    except QueryCancelled:
+        raise
     except Exception as e:
         print(f"[FATAL] Failed to fetch catalogs: {e}")
         traceback.print_exc()
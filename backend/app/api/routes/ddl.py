@@ -1,35 +1,56 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.core.trino_client import get_trino_connection
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.core.trino_client import pooled_connection, TRINO_SERVERS
+from app.core.cache import metadata_cache, table_snapshot, table_tag
+from app.core.deadlines import QueryCancelled
+from app.core.executor import run_trino
+from app.core.responses import conditional_json
+from app.core.singleflight import single_flight
 from trino.exceptions import TrinoUserError
 
 router = APIRouter()
 
 @router.get("/ddl", tags=["DDL"])
-def get_table_ddl(
+async def get_table_ddl(
+    request: Request,
     server: str = Query(...),
     catalog: str = Query(...),
     schema: str = Query(...),
     table: str = Query(...)
 ):
-    try:
-        from app.core.trino_client import TRINO_SERVERS
-        trino_server = TRINO_SERVERS.get(server)
-        if not trino_server:
-            raise HTTPException(status_code=404, detail="Trino server not found")
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+
+    # Drops cached entries from older snapshots. DDL changes create no
+    # snapshot, so the ETag is a digest of the (cached) body, not the snapshot id
+    await table_snapshot(server, trino_server, catalog, schema, table)
 
-        conn = get_trino_connection(
-            host=trino_server["host"],
-            port=trino_server["port"],
-            user=trino_server["user"],
-            catalog=catalog,
-            schema=schema
+    def load():
+        return metadata_cache.get_or_load(
+            "ddl",
+            (server, catalog, schema, table),
+            lambda: load_table_ddl(trino_server, catalog, schema, table),
+            tags=[table_tag(server, catalog, schema, table)]
         )
 
-        cursor = conn.cursor()
-        cursor.execute(f"SHOW CREATE TABLE {catalog}.{schema}.{table}")
-        ddl_result = cursor.fetchall()
+    ddl = await single_flight.do(
+        "ddl",
+        (server, catalog, schema, table),
+        lambda: run_trino(server, load)
+    )
+    return conditional_json(request, ddl)
+
+
+def load_table_ddl(trino_server, catalog, schema, table):
+    try:
+        with pooled_connection(trino_server, catalog, schema) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SHOW CREATE TABLE {catalog}.{schema}.{table}")
+            ddl_result = cursor.fetchall()
         return {"ddl": ddl_result[0][0] if ddl_result else ""}
     except TrinoUserError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except QueryCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
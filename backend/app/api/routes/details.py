@@ -0,0 +1,146 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.core.trino_client import pooled_connection, TRINO_SERVERS
+from app.core.cache import metadata_cache, sync_table_snapshot, table_tag
+from app.core.deadlines import QueryCancelled
+from app.core.executor import run_trino
+from app.core.singleflight import single_flight
+from app.core.iceberg_metadata import (
+    file_layout_totals,
+    iceberg_file_format,
+    read_file_layout,
+    read_files_aggregate,
+    read_iceberg_properties,
+    read_snapshots,
+    read_stats_row_count,
+)
+from app.api.routes.metadata import build_overview, ddl_file_format
+from app.core.optimize_planner import SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB
+from app.api.routes.statistics import build_statistics
+from trino.exceptions import TrinoUserError
+
+router = APIRouter()
+
+DETAIL_SECTIONS = ("overview", "snapshots", "statistics", "ddl")
+
+
+@router.get("/tables/{catalog}/{schema}/{table}/details", tags=["Tables"])
+async def get_table_details(
+    catalog: str,
+    schema: str,
+    table: str,
+    server: str = Query(...),
+    sections: str = Query(",".join(DETAIL_SECTIONS), description="Comma-separated: overview, snapshots, statistics, ddl")
+):
+    """Overview, snapshots, statistics and DDL for one table in one round trip.
+
+    All sections share a single connection, and each Iceberg metadata table
+    ($files, $snapshots, $properties) is read at most once.
+    """
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+
+    requested = [section.strip() for section in sections.split(",") if section.strip()]
+    unknown = [section for section in requested if section not in DETAIL_SECTIONS]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sections must be a subset of {', '.join(DETAIL_SECTIONS)}"
+        )
+
+    def load():
+        sync_table_snapshot(server, trino_server, catalog, schema, table)
+        return metadata_cache.get_or_load(
+            "details",
+            (server, catalog, schema, table, tuple(sorted(set(requested)))),
+            lambda: load_table_details(trino_server, catalog, schema, table, requested),
+            tags=[table_tag(server, catalog, schema, table)]
+        )
+
+    return await single_flight.do(
+        "details",
+        (server, catalog, schema, table, tuple(sorted(set(requested)))),
+        lambda: run_trino(server, load)
+    )
+
+
+def load_table_details(trino_server, catalog, schema, table, requested):
+    need_files = "overview" in requested or "statistics" in requested
+    need_snapshots = "overview" in requested or "snapshots" in requested or "statistics" in requested
+    need_ddl = "ddl" in requested
+
+    try:
+        with pooled_connection(trino_server, catalog, schema) as conn:
+            cursor = conn.cursor()
+
+            files, layout, snapshots, properties, ddl, stats_rows = None, None, None, None, None, None
+            if need_files:
+                try:
+                    if "statistics" in requested:
+                        # The per-partition layout also yields the overview totals
+                        layout = read_file_layout(cursor, catalog, schema, table,
+                                                  SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB * 1024 * 1024)
+                        files = file_layout_totals(layout)
+                    else:
+                        files = read_files_aggregate(cursor, catalog, schema, table)
+                except TrinoUserError as e:
+                    print(f"[WARN] $files read failed for {catalog}.{schema}.{table}: {e}")
+            if need_snapshots:
+                try:
+                    snapshots = read_snapshots(cursor, catalog, schema, table)
+                except TrinoUserError as e:
+                    print(f"[WARN] $snapshots read failed for {catalog}.{schema}.{table}: {e}")
+
+            is_iceberg = files is not None or snapshots is not None
+            if "overview" in requested:
+                if is_iceberg:
+                    try:
+                        properties = read_iceberg_properties(cursor, catalog, schema, table)
+                    except TrinoUserError as e:
+                        print(f"[WARN] $properties read failed for {catalog}.{schema}.{table}: {e}")
+                else:
+                    # No metadata tables: use connector statistics and the DDL
+                    stats_rows = read_stats_row_count(cursor, catalog, schema, table)
+                    need_ddl = True
+            if need_ddl:
+                cursor.execute(f'SHOW CREATE TABLE "{catalog}"."{schema}"."{table}"')
+                ddl_result = cursor.fetchall()
+                ddl = ddl_result[0][0] if ddl_result else ""
+
+        result = {"catalog": catalog, "schema": schema, "table": table}
+
+        if "overview" in requested:
+            if is_iceberg:
+                result["overview"] = build_overview(
+                    catalog, schema, table,
+                    total_rows=files["record_count"] if files else None,
+                    size_bytes=files["size_bytes"] if files else None,
+                    snapshot_count=snapshots["snapshot_count"] if snapshots else None,
+                    last_snapshot_time=snapshots["last_committed_at"] if snapshots else None,
+                    is_iceberg=True,
+                    table_format=iceberg_file_format(properties or {}),
+                    row_count_source="metadata"
+                )
+            else:
+                result["overview"] = build_overview(
+                    catalog, schema, table,
+                    total_rows=stats_rows,
+                    is_iceberg=False,
+                    row_count_source="stats",
+                    table_format=ddl_file_format(ddl) if ddl else None
+                )
+        if "snapshots" in requested:
+            result["snapshots"] = snapshots["snapshots"] if snapshots else None
+        if "statistics" in requested:
+            result["statistics"] = build_statistics(layout, snapshots)
+        if "ddl" in requested:
+            result["ddl"] = ddl
+
+        return result
+
+    except TrinoUserError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueryCancelled:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,43 @@
+from fastapi import APIRouter
+from app.core.deadlines import TRINO_HEAVY_STATEMENT_TIMEOUT, TRINO_STATEMENT_TIMEOUT, watchdog
+from app.core.executor import executor_stats
+from app.core.query_stats import query_stats
+from app.core.row_counts import row_counter
+from app.core.singleflight import single_flight
+from app.core.trino_client import connection_pool
+
+router = APIRouter()
+
+
+@router.get("/diagnostics/singleflight", tags=["Diagnostics"])
+def get_singleflight_stats():
+    return single_flight.stats()
+
+
+@router.get("/diagnostics/executors", tags=["Diagnostics"])
+def get_executor_stats():
+    return executor_stats()
+
+
+@router.get("/diagnostics/pool", tags=["Diagnostics"])
+def get_pool_stats():
+    return connection_pool.stats()
+
+
+@router.get("/diagnostics/query-stats", tags=["Diagnostics"])
+def get_query_stats_status():
+    return query_stats.status()
+
+
+@router.get("/diagnostics/row-counts", tags=["Diagnostics"])
+def get_row_count_status():
+    return row_counter.status()
+
+
+@router.get("/diagnostics/deadlines", tags=["Diagnostics"])
+def get_deadline_status():
+    return {
+        "statement_timeout_seconds": TRINO_STATEMENT_TIMEOUT,
+        "heavy_statement_timeout_seconds": TRINO_HEAVY_STATEMENT_TIMEOUT,
+        "watched_statements": watchdog.pending(),
+    }
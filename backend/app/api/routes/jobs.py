@@ -0,0 +1,82 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from app.core.trino_client import TRINO_SERVERS
+from app.core.jobs import JOB_MAX_PER_CATALOG, JOB_MAX_PER_SERVER, MaintenanceJob, job_scheduler
+from app.core.maintenance import MAINTENANCE_ACTIONS
+
+router = APIRouter()
+
+
+class JobRequest(BaseModel):
+    server: str
+    tables: List[str] = Field(..., min_length=1, description="Fully qualified names: catalog.schema.table")
+    actions: List[str] = Field(..., min_length=1, description="Run in order for each table")
+    older_than: int = 7
+    max_per_server: Optional[int] = Field(None, ge=1)
+    max_per_catalog: Optional[int] = Field(None, ge=1)
+    max_retries: int = Field(1, ge=0, le=10)
+
+
+@router.post("/jobs", tags=["Jobs"])
+def create_job(request: JobRequest):
+    server_info = TRINO_SERVERS.get(request.server)
+    if not server_info:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+
+    unknown = [action for action in request.actions if action not in MAINTENANCE_ACTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown actions {unknown}; expected any of {', '.join(MAINTENANCE_ACTIONS)}"
+        )
+
+    tables = []
+    for name in request.tables:
+        parts = name.split(".")
+        if len(parts) != 3 or not all(parts):
+            raise HTTPException(status_code=400, detail=f"Table must be catalog.schema.table, got '{name}'")
+        tables.append(tuple(parts))
+
+    job = MaintenanceJob(
+        request.server,
+        server_info,
+        tables,
+        request.actions,
+        older_than=request.older_than,
+        max_per_server=request.max_per_server or JOB_MAX_PER_SERVER,
+        max_per_catalog=request.max_per_catalog or JOB_MAX_PER_CATALOG,
+        max_retries=request.max_retries
+    )
+    job_scheduler.submit(job)
+    return job.summary()
+
+
+@router.get("/jobs", tags=["Jobs"])
+def list_jobs():
+    return {"jobs": job_scheduler.list()}
+
+
+@router.get("/jobs/{job_id}", tags=["Jobs"])
+def get_job(job_id: str):
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.detail()
+
+
+@router.get("/jobs/{job_id}/progress", tags=["Jobs"])
+def get_job_progress(job_id: str):
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"id": job.id, "status": job.status, **job.progress()}
+
+
+@router.post("/jobs/{job_id}/cancel", tags=["Jobs"])
+def cancel_job(job_id: str):
+    job = job_scheduler.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.summary()
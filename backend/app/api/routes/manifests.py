@@ -0,0 +1,133 @@
+import os
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.core.trino_client import pooled_connection, run_probes, TRINO_SERVERS
+from app.core.cache import metadata_cache, table_snapshot, table_tag
+from app.core.deadlines import QueryCancelled
+from app.core.executor import run_trino
+from app.core.responses import conditional_json, not_modified, snapshot_etag
+from app.core.singleflight import single_flight
+from app.core.sql import sql_literal
+from app.core.iceberg_metadata import MB, read_manifest_summary, read_manifests
+from trino.exceptions import TrinoUserError
+
+router = APIRouter()
+
+# Manifests below this size count as small (Iceberg targets 8MB per manifest)
+MANIFEST_SMALL_SIZE_MB = float(os.getenv("MANIFEST_SMALL_SIZE_MB", 1))
+# A table is flagged when it has at least MANIFEST_BLOAT_MIN_MANIFESTS manifests
+# and they track fewer than MANIFEST_MIN_FILES_PER_MANIFEST live data files each
+MANIFEST_BLOAT_MIN_MANIFESTS = int(os.getenv("MANIFEST_BLOAT_MIN_MANIFESTS", 16))
+MANIFEST_MIN_FILES_PER_MANIFEST = int(os.getenv("MANIFEST_MIN_FILES_PER_MANIFEST", 100))
+MANIFEST_SMALL_FRACTION = 0.5
+
+
+def manifest_health(summary):
+    """Flag manifest counts out of proportion to the data files they track."""
+    manifests = summary["manifests"]
+    live_files = summary["added_data_files"] + summary["existing_data_files"]
+    files_per_manifest = live_files / manifests if manifests else None
+    reasons = []
+    if manifests >= MANIFEST_BLOAT_MIN_MANIFESTS:
+        if files_per_manifest < MANIFEST_MIN_FILES_PER_MANIFEST:
+            reasons.append(
+                f"{manifests} manifests for {live_files} data files "
+                f"({files_per_manifest:.1f} per manifest, expected at least {MANIFEST_MIN_FILES_PER_MANIFEST})"
+            )
+        if summary["small_manifests"] >= MANIFEST_SMALL_FRACTION * manifests:
+            reasons.append(f"{summary['small_manifests']} of {manifests} manifests are under {MANIFEST_SMALL_SIZE_MB:g}MB")
+    return {
+        "bloated": bool(reasons),
+        "reasons": reasons,
+        "data_files_per_manifest": round(files_per_manifest, 1) if files_per_manifest is not None else None,
+        "recommended_action": "rewrite_manifests" if reasons else None,
+    }
+
+
+@router.get("/manifests", tags=["Manifests"])
+async def get_table_manifests(
+    request: Request,
+    server: str = Query(...),
+    catalog: str = Query(...),
+    schema: str = Query(...),
+    table: str = Query(...),
+    limit: int = Query(50, ge=0, le=10000, description="Manifests to list, fewest data files first")
+):
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+
+    snapshot_id = await table_snapshot(server, trino_server, catalog, schema, table)
+    etag = snapshot_etag(request, snapshot_id)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    def load():
+        return metadata_cache.get_or_load(
+            "manifests",
+            (server, catalog, schema, table, limit),
+            lambda: load_manifest_report(trino_server, catalog, schema, table, limit),
+            tags=[table_tag(server, catalog, schema, table)]
+        )
+
+    report = await single_flight.do(
+        "manifests",
+        (server, catalog, schema, table, limit),
+        lambda: run_trino(server, load)
+    )
+    return conditional_json(request, report, etag)
+
+
+def recheck_manifest_summary(trino_server, catalog, schema, table, small_bytes):
+    """Re-read a ``$manifests`` summary whose probe failed, reporting why it is missing.
+
+    404 if the table does not exist and 400 only when the table exists but
+    has no ``$manifests`` metadata table (not Iceberg); any other Trino
+    error is raised as is.
+    """
+    with pooled_connection(trino_server, catalog, schema) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT 1
+            FROM "{catalog}".information_schema.tables
+            WHERE table_schema = {sql_literal(schema)} AND table_name = {sql_literal(table)}
+        """)
+        if cursor.fetchone() is None:
+            raise HTTPException(status_code=404, detail=f"Table {catalog}.{schema}.{table} not found")
+        try:
+            return read_manifest_summary(cursor, catalog, schema, table, small_bytes)
+        except TrinoUserError as e:
+            if e.error_name != "TABLE_NOT_FOUND":
+                raise
+            raise HTTPException(status_code=400, detail=f"{catalog}.{schema}.{table} is not an Iceberg table")
+
+
+def load_manifest_report(trino_server, catalog, schema, table, limit=50):
+    try:
+        small_bytes = MANIFEST_SMALL_SIZE_MB * MB
+        probes = {"summary": lambda cursor: read_manifest_summary(cursor, catalog, schema, table, small_bytes)}
+        if limit:
+            probes["manifests"] = lambda cursor: read_manifests(cursor, catalog, schema, table, limit)
+        results = run_probes(trino_server, catalog, schema, probes)
+        summary = results["summary"]
+        if summary is None:
+            summary = recheck_manifest_summary(trino_server, catalog, schema, table, small_bytes)
+
+        return {
+            "catalog": catalog,
+            "schema": schema,
+            "table": table,
+            "summary": summary,
+            "health": manifest_health(summary),
+            "manifests": results.get("manifests") or []
+        }
+
+    except HTTPException:
+        raise
+    except TrinoUserError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueryCancelled:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
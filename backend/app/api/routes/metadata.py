@@ -1,90 +1,151 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.core.trino_client import get_trino_connection, TRINO_SERVERS
+import re
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.core.trino_client import run_probes, TRINO_SERVERS
+from app.core.cache import metadata_cache, table_snapshot, table_tag
+from app.core.deadlines import QueryCancelled
+from app.core.executor import run_trino
+from app.core.responses import conditional_json
+from app.core.singleflight import single_flight
+from app.core.iceberg_metadata import (
+    iceberg_file_format,
+    read_iceberg_properties,
+    read_iceberg_table_summary,
+    read_stats_row_count,
+)
+from app.core.row_counts import EXACT_COUNT_MODES, row_counter
 from trino.exceptions import TrinoUserError
 
 router = APIRouter()
 
+
+def ddl_file_format(ddl):
+    # Hive-style DDL carries the format as a table property: format = 'ORC'
+    match = re.search(r"format\s*=\s*'(\w+)'", ddl, re.IGNORECASE)
+    return match.group(1).upper() if match else "UNKNOWN"
+
+
+def build_overview(catalog, schema, table, total_rows=None, size_bytes=None, snapshot_count=None,
+                   last_snapshot_time=None, is_iceberg=None, table_format=None, row_count_source=None):
+    return {
+        "catalog": catalog,
+        "schema": schema,
+        "table": table,
+        "total_rows": total_rows,
+        # "metadata" ($files) is exact up to row-level deletes; "stats" is a connector estimate
+        "row_count_source": row_count_source if total_rows is not None else None,
+        "row_count_approximate": row_count_source == "stats" if total_rows is not None else None,
+        "data_size_mb": round(size_bytes / (1024 * 1024), 2) if size_bytes is not None else None,
+        "snapshot_count": snapshot_count,
+        "last_snapshot_time": last_snapshot_time,
+        "table_type": "ICEBERG" if is_iceberg else "OTHER",
+        "format": table_format
+    }
+
+
 @router.get("/metadata", tags=["Metadata"])
-def get_table_metadata(
+async def get_table_metadata(
+    request: Request,
     server: str = Query(...),
     catalog: str = Query(...),
     schema: str = Query(...),
-    table: str = Query(...)
+    table: str = Query(...),
+    exact_count: str = Query("never", description="never | background | wait: exact COUNT(*) for tables with estimated row counts")
 ):
-    try:
-        trino_server = TRINO_SERVERS.get(server)
-        if not trino_server:
-            raise HTTPException(status_code=404, detail="Trino server not found")
-
-        conn = get_trino_connection(
-            host=trino_server["host"],
-            port=trino_server["port"],
-            user=trino_server["user"],
-            catalog=catalog,
-            schema=schema
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+    if exact_count not in EXACT_COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"exact_count must be one of {', '.join(EXACT_COUNT_MODES)}")
+
+    # Drops cached entries from older snapshots. Property changes (e.g. the
+    # write format) create no snapshot, so the ETag is a digest of the body
+    await table_snapshot(server, trino_server, catalog, schema, table)
+
+    def load():
+        return metadata_cache.get_or_load(
+            "metadata",
+            (server, catalog, schema, table),
+            lambda: load_table_metadata(trino_server, catalog, schema, table),
+            tags=[table_tag(server, catalog, schema, table)]
         )
-        cursor = conn.cursor()
-
-        # --- Total rows ---
-        try:
-            cursor.execute(f'SELECT COUNT(*) FROM "{catalog}"."{schema}"."{table}"')
-            total_rows = cursor.fetchone()[0]
-        except Exception as e:
-            print("Row count fetch error:", e)
-            total_rows = None
-
-        # --- Snapshot info ---
-        try:
-            cursor.execute(f'''
-                SELECT 
-                    COUNT(*) as snapshot_count,
-                    MAX(committed_at) as last_snapshot_time
-                FROM "{catalog}"."{schema}"."{table}$snapshots"
-            ''')
-            snapshot_result = cursor.fetchone()
-            snapshot_count = snapshot_result[0]
-            last_snapshot_time = snapshot_result[1]
-        except Exception as e:
-            print("Snapshot fetch error:", e)
+
+    overview = await single_flight.do(
+        "metadata",
+        (server, catalog, schema, table),
+        lambda: run_trino(server, load)
+    )
+    if overview["row_count_source"] != "stats" and overview["total_rows"] is not None:
+        return conditional_json(request, overview)
+
+    # Estimated (or unknown) count: swap in the exact count once there is one.
+    # Kept outside the cached overview so a finished count shows up at once.
+    if exact_count == "wait" and row_counter.cached(server, catalog, schema, table) is None:
+        await run_trino(server, row_counter.count, server, trino_server, catalog, schema, table, heavy=True)
+    rows, approximate, status = row_counter.resolve(
+        server, trino_server, catalog, schema, table, overview["total_rows"], mode=exact_count
+    )
+    return conditional_json(request, {
+        **overview,
+        "total_rows": rows,
+        "row_count_source": "exact" if not approximate else overview["row_count_source"],
+        "row_count_approximate": approximate if rows is not None else None,
+        "exact_count_status": status
+    })
+
+
+def load_table_metadata(trino_server, catalog, schema, table):
+    try:
+        # One $files/$snapshots aggregate and the $properties lookup, concurrently
+        probes = run_probes(trino_server, catalog, schema, {
+            "summary": lambda cursor: read_iceberg_table_summary(cursor, catalog, schema, table),
+            "properties": lambda cursor: read_iceberg_properties(cursor, catalog, schema, table),
+        })
+        summary = probes["summary"]
+        properties = probes["properties"]
+
+        if summary is not None or properties is not None:
+            is_iceberg = True
+            table_format = iceberg_file_format(properties or {})
+            total_rows = summary["rows"] if summary else None
+            row_count_source = "metadata"
+            size_bytes = summary["size_bytes"] if summary else None
+            snapshot_count = summary["snapshot_count"] if summary else None
+            last_snapshot_time = summary["last_modified"] if summary else None
+        else:
+            # Not an Iceberg table: no metadata tables to read. Answer with the
+            # connector's estimate; the exact COUNT(*) runs in the background
+            def show_create(cursor):
+                cursor.execute(f'SHOW CREATE TABLE "{catalog}"."{schema}"."{table}"')
+                return cursor.fetchone()[0]
+
+            probes = run_probes(trino_server, catalog, schema, {
+                "total_rows": lambda cursor: read_stats_row_count(cursor, catalog, schema, table),
+                "ddl": show_create,
+            })
+            ddl_result = probes["ddl"]
+            is_iceberg = False if ddl_result is not None else None
+            table_format = ddl_file_format(ddl_result) if ddl_result is not None else None
+            total_rows = probes["total_rows"]
+            row_count_source = "stats"
+            size_bytes = None
             snapshot_count = None
             last_snapshot_time = None
 
-        # --- Data size (MB) ---
-        try:
-            cursor.execute(f'''
-                SELECT SUM(file_size_in_bytes) 
-                FROM "{catalog}"."{schema}"."{table}$files"
-            ''')
-            bytes_result = cursor.fetchone()
-            data_size = round((bytes_result[0] or 0) / (1024 * 1024), 2)
-        except Exception as e:
-            print("Data size fetch error:", e)
-            data_size = None
-
-        # --- Table type and format ---
-        try:
-            cursor.execute(f'SHOW CREATE TABLE "{catalog}"."{schema}"."{table}"')
-            ddl_result = cursor.fetchone()[0]
-            is_iceberg = "iceberg" in ddl_result.lower()
-            table_format = "PARQUET" if "parquet" in ddl_result.lower() else "UNKNOWN"
-        except Exception as e:
-            print("DDL fetch error:", e)
-            is_iceberg = None
-            table_format = None
-
-        return {
-            "catalog": catalog,
-            "schema": schema,
-            "table": table,
-            "total_rows": total_rows,
-            "data_size_mb": data_size,
-            "snapshot_count": snapshot_count,
-            "last_snapshot_time": last_snapshot_time,
-            "table_type": "ICEBERG" if is_iceberg else "OTHER",
-            "format": table_format
-        }
+        return build_overview(
+            catalog, schema, table,
+            total_rows=total_rows,
+            size_bytes=size_bytes,
+            snapshot_count=snapshot_count,
+            last_snapshot_time=last_snapshot_time,
+            is_iceberg=is_iceberg,
+            table_format=table_format,
+            row_count_source=row_count_source
+        )
 
     except TrinoUserError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except QueryCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
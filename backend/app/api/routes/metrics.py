@@ -0,0 +1,73 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.cache import metadata_cache
+from app.core.executor import executor_stats
+from app.core.metrics import registry
+from app.core.singleflight import single_flight
+from app.core.trino_client import connection_pool
+
+router = APIRouter()
+
+
+def collect_pool():
+    stats = connection_pool.stats()
+    servers = stats["servers"]
+    return [
+        ("trino_pool_connections_open", "gauge", "Open pooled Trino connections.",
+         [({"server": server}, values["open"]) for server, values in servers.items()]),
+        ("trino_pool_connections_in_use", "gauge", "Checked-out pooled Trino connections.",
+         [({"server": server}, values["in_use"]) for server, values in servers.items()]),
+        ("trino_pool_connections_max", "gauge", "Pooled Trino connection limit per server.",
+         [({"server": server}, values["max"]) for server, values in servers.items()]),
+        ("trino_pool_connections_created_total", "counter", "Trino connections opened by the pool.",
+         [({}, stats["created"])]),
+        ("trino_pool_connections_reused_total", "counter", "Pooled Trino connections handed out again.",
+         [({}, stats["reused"])]),
+        ("trino_pool_connections_discarded_total", "counter", "Pooled Trino connections closed.",
+         [({}, stats["discarded"])]),
+    ]
+
+
+def collect_cache():
+    stats = metadata_cache.stats()
+    namespaces = stats["namespaces"]
+    return [
+        ("metadata_cache_hits_total", "counter", "Metadata cache hits by namespace.",
+         [({"namespace": namespace}, values["hits"]) for namespace, values in namespaces.items()]),
+        ("metadata_cache_misses_total", "counter", "Metadata cache misses by namespace.",
+         [({"namespace": namespace}, values["misses"]) for namespace, values in namespaces.items()]),
+        ("metadata_cache_entries", "gauge", "Entries in the metadata cache.", [({}, stats["entries"])]),
+        ("metadata_cache_evictions_total", "counter", "Metadata cache LRU evictions.", [({}, stats["evictions"])]),
+        ("metadata_cache_invalidations_total", "counter", "Metadata cache tag invalidations.",
+         [({}, stats["invalidations"])]),
+    ]
+
+
+def collect_executors():
+    stats = executor_stats()
+    samples = [(dict(zip(("server", "lane"), key.split("/", 1))), values) for key, values in stats.items()]
+    return [
+        ("trino_executor_in_flight", "gauge", "Trino calls running or queued per server and lane.",
+         [(labels, values["in_flight"]) for labels, values in samples]),
+        ("trino_executor_rejected_total", "counter", "Trino calls rejected as overloaded.",
+         [(labels, values["rejected"]) for labels, values in samples]),
+    ]
+
+
+def collect_singleflight():
+    endpoints = single_flight.stats()["endpoints"]
+    return [
+        ("singleflight_calls_total", "counter", "Requests entering single-flight coalescing.",
+         [({"endpoint": endpoint}, values["calls"]) for endpoint, values in endpoints.items()]),
+        ("singleflight_deduplicated_total", "counter", "Requests served by another request's in-flight load.",
+         [({"endpoint": endpoint}, values["deduplicated"]) for endpoint, values in endpoints.items()]),
+    ]
+
+
+for collector in (collect_pool, collect_cache, collect_executors, collect_singleflight):
+    registry.add_collector(collector)
+
+
+@router.get("/metrics", tags=["Diagnostics"], response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
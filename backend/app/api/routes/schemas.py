@@ -1,56 +1,178 @@
 # app/api/routes/schemas.py
 
-from fastapi import APIRouter, HTTPException, Query
-from app.core.trino_client import TRINO_SERVERS, get_trino_connection
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.core.trino_client import TRINO_SERVERS, pooled_connection
+from app.core.cache import metadata_cache
+from app.core.deadlines import QueryCancelled, streaming_statements
+from app.core.executor import run_trino
+from app.core.responses import conditional_json
+from app.core.singleflight import single_flight
+from app.core.sql import sql_literal
+from app.core.streaming import RESPONSE_FORMATS, InvalidCursor, decode_cursor, encode_cursor, iter_rows, ndjson_response
+from trino.exceptions import TrinoUserError
 
 router = APIRouter()
 
+
+def fetch_schema_sizes(cursor, catalog, tables_by_schema):
+    """Total data size per schema, summed from each table's Iceberg $files.
+
+    Schemas whose tables do not expose $files (non-Iceberg connectors) are
+    left out of the result.
+    """
+    sizes = {}
+    for schema, table_names in tables_by_schema.items():
+        if not table_names:
+            sizes[schema] = 0
+            continue
+        union = " UNION ALL ".join(
+            f'SELECT SUM(file_size_in_bytes) AS size_bytes FROM "{catalog}"."{schema}"."{name}$files"'
+            for name in table_names
+        )
+        try:
+            cursor.execute(f"SELECT SUM(size_bytes) FROM ({union})")
+            sizes[schema] = cursor.fetchone()[0] or 0
+        except TrinoUserError as e:
+            print(f"[WARN] Could not size schema {catalog}.{schema}: {e}")
+    return sizes
+
+
 @router.get("/schemas", tags=["Schemas"])
-def list_schemas(
+async def list_schemas(
+    request: Request,
     server: str = Query(...),
-    catalog: str = Query(...)
+    catalog: str = Query(...),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    include_size: bool = Query(False),
+    page_cursor: str = Query(None, alias="cursor", description="next_cursor from the previous page; replaces offset"),
+    response_format: str = Query("json", alias="format", description="json | ndjson")
 ):
     server_info = TRINO_SERVERS.get(server)
-
     if not server_info:
         raise HTTPException(status_code=404, detail="Trino server not found")
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(RESPONSE_FORMATS)}")
 
-    try:
-        conn = get_trino_connection(
-            host=server_info["host"],
-            port=server_info["port"],
-            user=server_info["user"],
-            catalog=catalog,
-            schema="information_schema"
+    after = None
+    if page_cursor:
+        try:
+            after = decode_cursor(page_cursor)["after"]
+        except (InvalidCursor, KeyError):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    if response_format == "ndjson":
+        if include_size:
+            raise HTTPException(status_code=400, detail="include_size is not supported with format=ndjson")
+        return ndjson_response(server, lambda: iter_schemas(server_info, catalog, after))
+
+    def load():
+        return metadata_cache.get_or_load(
+            "schemas",
+            (server, catalog, offset, limit, include_size, after),
+            lambda: load_schemas(server_info, catalog, offset, limit, include_size, after)
+        )
+
+    listing = await single_flight.do(
+        "schemas",
+        (server, catalog, offset, limit, include_size, after),
+        lambda: run_trino(server, load)
+    )
+    return conditional_json(request, listing)
+
+
+def schemas_query(catalog, offset=0, limit=None, after=None):
+    """Schemas with table counts and the catalog's total, in name order.
+
+    Paging by ``after`` (keyset) is preferred over ``offset``; the filter is
+    applied outside the window so ``total`` still counts every schema.
+    """
+    query = f'''
+        SELECT schema_name, table_count, total_schemas
+        FROM (
+            SELECT
+                s.schema_name,
+                COUNT(t.table_name) AS table_count,
+                COUNT(*) OVER () AS total_schemas
+            FROM "{catalog}".information_schema.schemata s
+            LEFT JOIN "{catalog}".information_schema.tables t
+                ON t.table_schema = s.schema_name
+            GROUP BY s.schema_name
         )
+    '''
+    if after is not None:
+        query += f" WHERE schema_name > {sql_literal(after)}"
+    query += " ORDER BY schema_name"
+    if offset and after is None:
+        query += f" OFFSET {offset}"
+    if limit is not None:
+        query += f" LIMIT {limit}"
+    return query
+
 
+def iter_schemas(server_info, catalog, after=None):
+    """Yield every schema (after ``after``) from fetchmany() batches."""
+    with pooled_connection(server_info, catalog, "information_schema") as conn:
         cursor = conn.cursor()
-        cursor.execute("SHOW SCHEMAS")
-        schema_rows = cursor.fetchall()
-        schema_names = [row[0] for row in schema_rows]
+        with streaming_statements():
+            cursor.execute(schemas_query(catalog, after=after))
+        finished = False
+        try:
+            for schema, table_count, _ in iter_rows(cursor):
+                yield {"name": schema, "tables": table_count, "size": "N/A", "description": "Fetched successfully"}
+            finished = True
+        finally:
+            if not finished:
+                try:
+                    cursor.close()
+                except Exception as e:
+                    print(f"[WARN] Failed to cancel schema listing: {e}")
+
+
+def load_schemas(server_info, catalog, offset, limit, include_size, after=None):
+    try:
+        with pooled_connection(server_info, catalog, "information_schema") as conn:
+            cursor = conn.cursor()
+            cursor.execute(schemas_query(catalog, offset, limit, after))
+            rows = cursor.fetchall()
+            total = rows[0][2] if rows else 0
+
+            sizes = {}
+            if include_size and rows:
+                in_list = ", ".join(sql_literal(row[0]) for row in rows)
+                cursor.execute(f'''
+                    SELECT table_schema, table_name
+                    FROM "{catalog}".information_schema.tables
+                    WHERE table_schema IN ({in_list})
+                ''')
+                tables_by_schema = {row[0]: [] for row in rows}
+                for table_schema, table_name in cursor.fetchall():
+                    tables_by_schema[table_schema].append(table_name)
+                sizes = fetch_schema_sizes(cursor, catalog, tables_by_schema)
 
         results = []
-        for schema in schema_names:
-            try:
-                cursor.execute(f"SHOW TABLES FROM {schema}")
-                tables = [row[0] for row in cursor.fetchall()]
-                table_count = len(tables)
-
-                results.append({
-                    "name": schema,
-                    "tables": table_count,
-                    "size": "N/A",  # You can keep this if frontend expects it
-                    "description": "Fetched successfully"
-                })
-            except:
-                results.append({
-                    "name": schema,
-                    "tables": "N/A",
-                    "size": "N/A",
-                    "description": "No description"
-                })
-
-        return {"schemas": results}
+        for schema, table_count, _ in rows:
+            size_bytes = sizes.get(schema)
+            results.append({
+                "name": schema,
+                "tables": table_count,
+                "size": f"{round(size_bytes / (1024 * 1024), 2)} MB" if size_bytes is not None else "N/A",
+                "description": "Fetched successfully"
+            })
+
+        # A full page means there may be more; keyset and offset paging both continue from here
+        more = len(rows) == limit
+        next_offset = offset + len(rows) if after is None else None
+        return {
+            "schemas": results,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset if next_offset is not None and next_offset < total else None,
+            "next_cursor": encode_cursor({"after": rows[-1][0]}) if more else None
+        }
 
+    except QueryCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
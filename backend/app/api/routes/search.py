@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.core.metadata_index import metadata_index
+
+router = APIRouter()
+
+
+@router.get("/search", tags=["Search"])
+def search_metadata(
+    q: str = Query(..., min_length=1),
+    server: str = Query(None),
+    kind: str = Query("all", description="all | table | column"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    if kind not in ("all", "table", "column"):
+        raise HTTPException(status_code=400, detail="kind must be one of all, table, column")
+    return {"query": q, "results": metadata_index.search(q, server=server, kind=kind, limit=limit)}
+
+
+@router.get("/search/status", tags=["Search"])
+def get_index_status():
+    return metadata_index.status()
+
+
+@router.post("/search/reindex", tags=["Search"])
+def reindex_metadata():
+    started = metadata_index.trigger()
+    return {"status": "started" if started else "already_running"}
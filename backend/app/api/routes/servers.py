@@ -1,39 +1,56 @@
-from fastapi import APIRouter
-from app.core.trino_client import get_trino_connection, TRINO_SERVERS
+from fastapi import APIRouter, HTTPException, Query
+from app.core.trino_client import TRINO_SERVERS
+from app.core.health import health_monitor
+from app.core.query_stats import query_stats
 
 router = APIRouter()
 
 @router.get("/trino-servers")
 def list_trino_servers():
-    servers_info = []
+    # Served from the background health monitor; only a cold start waits
+    # (briefly) for the first round of probes
+    health_monitor.wait_for_first_cycle()
 
+    servers_info = []
     for name, server in TRINO_SERVERS.items():
-        try:
-            conn = get_trino_connection(
-                host=server["host"],
-                port=server["port"],
-                user=server["user"],
-                catalog="system",
-                schema="information_schema"
-            )
-            cursor = conn.cursor()
-            cursor.execute("SHOW CATALOGS")
-            catalogs = cursor.fetchall()
-            catalog_count = len(catalogs)
-            status = "online"
-        except Exception as e:
-            print(f"❌ Error connecting to {name}: {e}")
-            catalog_count = None
-            status = "offline"
-
+        state = health_monitor.snapshot(name)
         servers_info.append({
             "name": name,
             "host": server["host"],
             "port": server["port"],
             "user": server["user"],
-            "catalogs": catalog_count,
-            "status": status,
-            "lastConnected": "just now" if status == "online" else "N/A"
+            "catalogs": state["catalogs"],
+            "status": state["status"],
+            "lastConnected": state["last_connected"] or "N/A",
+            "lastChecked": state["last_checked"],
+            "latencyMs": state["latency_ms"],
+            "error": state["error"]
         })
 
     return servers_info
+
+
+@router.get("/trino-servers/{name}/health")
+def get_trino_server_health(name: str):
+    if name not in TRINO_SERVERS:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+    return {
+        "name": name,
+        **health_monitor.snapshot(name),
+        "history": health_monitor.history(name)
+    }
+
+
+@router.get("/trino-servers/{name}/hot-tables")
+def get_hottest_tables(
+    name: str,
+    limit: int = Query(20, ge=1, le=500),
+    order_by: str = Query("queries", pattern="^(queries|bytes_scanned|p95_ms|p99_ms|failed)$")
+):
+    if name not in TRINO_SERVERS:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+    return {
+        "server": name,
+        "order_by": order_by,
+        "tables": query_stats.hottest_tables(name, limit=limit, order_by=order_by)
+    }
@@ -1,64 +1,193 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.core.trino_client import get_trino_connection, TRINO_SERVERS
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.core.trino_client import pooled_connection, TRINO_SERVERS
+from app.core.cache import metadata_cache, table_snapshot, table_tag
+from app.core.deadlines import QueryCancelled, streaming_statements
+from app.core.executor import run_trino
+from app.core.responses import conditional_json, not_modified, snapshot_etag
+from app.core.singleflight import single_flight
+from app.core.iceberg_metadata import (
+    TIMELINE_GRANULARITIES,
+    read_snapshot_timeline,
+    snapshot_from_row,
+    snapshot_page_query,
+)
+from app.core.streaming import RESPONSE_FORMATS, InvalidCursor, decode_cursor, encode_cursor, iter_rows, ndjson_response
 from trino.exceptions import TrinoUserError
 
 router = APIRouter()
 
+SNAPSHOT_PAGE_SIZE = 50
+
+
 @router.get("/snapshots", tags=["Snapshots"])
-def get_snapshots(
+async def get_snapshots(
+    request: Request,
     server: str = Query(...),
     catalog: str = Query(...),
     schema: str = Query(...),
-    table: str = Query(...)
+    table: str = Query(...),
+    limit: int = Query(SNAPSHOT_PAGE_SIZE, ge=1, le=10000, description="Page size (ignored by format=ndjson)"),
+    page_cursor: str = Query(None, alias="cursor", description="next_cursor from the previous page"),
+    response_format: str = Query("json", alias="format", description="json | ndjson")
 ):
     trino_server = TRINO_SERVERS.get(server)
     if not trino_server:
         raise HTTPException(status_code=404, detail="Trino server not found")
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(RESPONSE_FORMATS)}")
 
-    try:
-        conn = get_trino_connection(
-            host=trino_server["host"],
-            port=trino_server["port"],
-            user=trino_server["user"],
-            catalog=catalog,
-            schema=schema
+    before = None
+    if page_cursor:
+        try:
+            position = decode_cursor(page_cursor)
+            before = (datetime.fromisoformat(position["committed_at"]), int(position["snapshot_id"]))
+        except (InvalidCursor, KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    if response_format == "ndjson":
+        # The whole history from the cursor on; memory stays flat either way
+        return ndjson_response(server, lambda: iter_snapshots(trino_server, catalog, schema, table, before))
+
+    snapshot_id = await table_snapshot(server, trino_server, catalog, schema, table)
+    etag = snapshot_etag(request, snapshot_id)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    def load():
+        return metadata_cache.get_or_load(
+            "snapshots",
+            (server, catalog, schema, table, limit, before),
+            lambda: load_snapshots(trino_server, catalog, schema, table, limit, before),
+            tags=[table_tag(server, catalog, schema, table)]
         )
-        cursor = conn.cursor()
 
-        # Try fetching snapshot data
+    page = await single_flight.do(
+        "snapshots",
+        (server, catalog, schema, table, limit, before),
+        lambda: run_trino(server, load)
+    )
+    return conditional_json(request, page, etag)
+
+
+@router.get("/snapshots/timeline", tags=["Snapshots"])
+async def get_snapshot_timeline(
+    request: Request,
+    server: str = Query(...),
+    catalog: str = Query(...),
+    schema: str = Query(...),
+    table: str = Query(...),
+    granularity: str = Query("day", description="hour | day"),
+    since_snapshot_id: int = Query(None, description="latest_snapshot_id from the previous response")
+):
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+    if granularity not in TIMELINE_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(TIMELINE_GRANULARITIES)}")
+
+    snapshot_id = await table_snapshot(server, trino_server, catalog, schema, table)
+    etag = snapshot_etag(request, snapshot_id)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    def load():
+        return metadata_cache.get_or_load(
+            "snapshot_timeline",
+            (server, catalog, schema, table, granularity, since_snapshot_id),
+            lambda: load_snapshot_timeline(trino_server, catalog, schema, table, granularity, since_snapshot_id),
+            tags=[table_tag(server, catalog, schema, table)]
+        )
+
+    timeline = await single_flight.do(
+        "snapshot_timeline",
+        (server, catalog, schema, table, granularity, since_snapshot_id),
+        lambda: run_trino(server, load)
+    )
+    return conditional_json(request, timeline, etag)
+
+
+def load_snapshot_timeline(trino_server, catalog, schema, table, granularity="day", since_snapshot_id=None):
+    """Hourly/daily growth and churn series, optionally only after ``since_snapshot_id``.
+
+    Deltas (added/deleted records, files, bytes) add up across responses, so
+    a client merging an incremental response sums them into its last bucket;
+    totals are as of each bucket's last snapshot and replace the old value.
+    """
+    try:
+        with pooled_connection(trino_server, catalog, schema) as conn:
+            timeline = read_snapshot_timeline(conn.cursor(), catalog, schema, table, granularity, since_snapshot_id)
+        return {
+            "catalog": catalog,
+            "schema": schema,
+            "table": table,
+            "granularity": granularity,
+            "since_snapshot_id": since_snapshot_id,
+            **timeline
+        }
+
+    except TrinoUserError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueryCancelled:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def snapshot_cursor(snapshot):
+    return encode_cursor({"committed_at": snapshot["committed_at"].isoformat(), "snapshot_id": snapshot["snapshot_id"]})
+
+
+def iter_snapshots(trino_server, catalog, schema, table, before=None):
+    with pooled_connection(trino_server, catalog, schema) as conn:
+        cursor = conn.cursor()
+        with streaming_statements():
+            cursor.execute(snapshot_page_query(catalog, schema, table, before=before))
+        finished = False
         try:
-            cursor.execute(f'''
-                SELECT 
-                    snapshot_id,
-                    committed_at,
-                    operation,
-                    summary 
-                FROM "{catalog}"."{schema}"."{table}$snapshots"
-                ORDER BY committed_at DESC
-                LIMIT 50
-            ''')
-            result = cursor.fetchall()
-            snapshots = [
-                {
-                    "snapshot_id": row[0],
-                    "committed_at": row[1],
-                    "operation": row[2],
-                    "summary": row[3]
-                }
-                for row in result
-            ]
-        except Exception:
-            # If table or snapshot system table doesn't exist, return empty list
-            snapshots = None
+            for row in iter_rows(cursor):
+                yield snapshot_from_row(row)
+            finished = True
+        finally:
+            if not finished:
+                try:
+                    cursor.close()
+                except Exception as e:
+                    print(f"[WARN] Failed to cancel snapshot listing: {e}")
+
+
+def load_snapshots(trino_server, catalog, schema, table, limit=SNAPSHOT_PAGE_SIZE, before=None):
+    try:
+        with pooled_connection(trino_server, catalog, schema) as conn:
+            cursor = conn.cursor()
+
+            # Try fetching snapshot data
+            next_cursor = None
+            try:
+                # One extra row tells us whether there is another page
+                cursor.execute(snapshot_page_query(catalog, schema, table, limit=limit + 1, before=before))
+                snapshots = [snapshot_from_row(row) for row in cursor.fetchall()]
+                if len(snapshots) > limit:
+                    snapshots = snapshots[:limit]
+                    next_cursor = snapshot_cursor(snapshots[-1])
+            except TrinoUserError:
+                # If table or snapshot system table doesn't exist, return empty list
+                snapshots = None
 
         return {
             "catalog": catalog,
             "schema": schema,
             "table": table,
-            "snapshots": snapshots
+            "snapshots": snapshots,
+            "next_cursor": next_cursor
         }
 
     except TrinoUserError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except QueryCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
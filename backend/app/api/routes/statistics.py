@@ -1,62 +1,138 @@
-from fastapi import APIRouter, Query, HTTPException
-from app.core.trino_client import get_trino_connection, TRINO_SERVERS
+from fastapi import APIRouter, Query, HTTPException, Request
+from app.core.trino_client import run_probes, TRINO_SERVERS
+from app.core.cache import metadata_cache, table_snapshot, table_tag
+from app.core.deadlines import QueryCancelled
+from app.core.executor import run_trino
+from app.core.responses import conditional_json, not_modified, snapshot_etag
+from app.core.singleflight import single_flight
+from app.core.query_stats import query_stats
+from app.core.iceberg_metadata import FILE_SIZE_BUCKETS, file_layout_totals, read_file_layout, read_last_optimize
+from app.core.optimize_planner import SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB, partition_label
 from trino.exceptions import TrinoUserError
 
 router = APIRouter()
 
+
+SKEW_TOP_PARTITIONS = 5
+
+
+def build_statistics(layout, optimize=None, small_file_mb=SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB):
+    """Statistics payload from a read_file_layout() result (or None).
+
+    ``optimize`` is any dict with last_optimized_at/optimize_count, e.g. a
+    read_last_optimize() or read_snapshots() result.
+    """
+    optimize = optimize or {}
+    performance = {
+        "last_optimized": optimize.get("last_optimized_at"),
+        "optimize_count": optimize.get("optimize_count")
+    }
+    if layout is None:
+        return {"file_statistics": {"total_files": None, "avg_file_size_mb": None}, "performance": performance}
+
+    totals = file_layout_totals(layout)
+    data_files = sum(partition["data_files"] for partition in layout)
+    data_bytes = sum(partition["data_bytes"] for partition in layout)
+    small_files = sum(partition["small_files"] for partition in layout)
+    histogram = {
+        label: sum(partition["histogram"][label] for partition in layout) for label, _ in FILE_SIZE_BUCKETS
+    }
+
+    partition_sizes = sorted(layout, key=lambda partition: partition["data_bytes"], reverse=True)
+    mean_bytes = data_bytes / len(layout) if layout else 0
+    partitions = {
+        "partition_count": sum(1 for partition in layout if partition["partition"] is not None),
+        "max_bytes": partition_sizes[0]["data_bytes"] if layout else 0,
+        "min_bytes": partition_sizes[-1]["data_bytes"] if layout else 0,
+        "avg_bytes": round(mean_bytes),
+        # Largest partition relative to the average; 1.0 means perfectly even
+        "skew_ratio": round(partition_sizes[0]["data_bytes"] / mean_bytes, 2) if mean_bytes else None,
+        "largest": [
+            {
+                "partition": partition_label(partition["partition"]),
+                "data_bytes": partition["data_bytes"],
+                "data_files": partition["data_files"],
+                "small_files": partition["small_files"]
+            }
+            for partition in partition_sizes[:SKEW_TOP_PARTITIONS]
+            if partition["partition"] is not None
+        ]
+    }
+
+    return {
+        "file_statistics": {
+            "total_files": totals["file_count"],
+            "data_files": data_files,
+            "avg_file_size_mb": round(data_bytes / data_files / 1024 / 1024, 2) if data_files else None,
+            "avg_row_size_bytes": round(data_bytes / totals["record_count"], 2) if totals["record_count"] else None,
+            "small_file_threshold_mb": small_file_mb,
+            "small_files": small_files,
+            "small_file_ratio": round(small_files / data_files, 4) if data_files else None,
+            "size_histogram": [{"bucket": label, "files": count} for label, count in histogram.items()]
+        },
+        "delete_files": {
+            "position_delete_files": sum(partition["position_delete_files"] for partition in layout),
+            "equality_delete_files": sum(partition["equality_delete_files"] for partition in layout),
+            "position_deletes": sum(partition["position_deletes"] for partition in layout),
+            "delete_bytes": sum(partition["delete_bytes"] for partition in layout)
+        },
+        "partitions": partitions,
+        "performance": performance
+    }
+
+
 @router.get("/statistics", tags=["Statistics"])
-def get_table_statistics(
+async def get_table_statistics(
+    request: Request,
     server: str = Query(...),
     catalog: str = Query(...),
     schema: str = Query(...),
-    table: str = Query(...)
+    table: str = Query(...),
+    small_file_mb: int = Query(SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB, ge=1, description="Data files below this size count as small")
 ):
-    try:
-        trino_server = TRINO_SERVERS.get(server)
-        if not trino_server:
-            raise HTTPException(status_code=404, detail="Trino server not found")
-
-        conn = get_trino_connection(
-            host=trino_server["host"],
-            port=trino_server["port"],
-            user=trino_server["user"],
-            catalog=catalog,
-            schema=schema
+    trino_server = TRINO_SERVERS.get(server)
+    if not trino_server:
+        raise HTTPException(status_code=404, detail="Trino server not found")
+
+    snapshot_id = await table_snapshot(server, trino_server, catalog, schema, table)
+    # Query stats change with every sample, so they stay out of the cached payload
+    queries = query_stats.table_stats(server, catalog, schema, table)
+    etag = snapshot_etag(request, snapshot_id, queries)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    def load():
+        return metadata_cache.get_or_load(
+            "statistics",
+            (server, catalog, schema, table, small_file_mb),
+            lambda: load_table_statistics(trino_server, catalog, schema, table, small_file_mb),
+            tags=[table_tag(server, catalog, schema, table)]
         )
-        cursor = conn.cursor()
-
-        # File Stats
-        try:
-            cursor.execute(f'''
-                SELECT 
-                    COUNT(*) as total_files,
-                    ROUND(AVG(file_size_in_bytes) / 1024 / 1024, 2) as avg_file_size_mb,
-                    ROUND(SUM(file_size_in_bytes) / SUM(record_count), 2) as compression_ratio
-                FROM "{catalog}"."{schema}"."{table}$files"
-            ''')
-            result = cursor.fetchone()
-            total_files = result[0]
-            avg_file_size_mb = result[1]
-            compression_ratio = result[2]
-        except Exception:
-            total_files = None
-            avg_file_size_mb = None
-            compression_ratio = None
-
-        return {
-            "file_statistics": {
-                "total_files": total_files,
-                "avg_file_size_mb": avg_file_size_mb,
-                "compression_ratio": f"{compression_ratio}:1" if compression_ratio else None
-            },
-            "performance": {
-                "avg_query_time": "2.3s",
-                "cache_hit_rate": "87%",
-                "last_optimized": "3 days ago"
-            }
-        }
+
+    statistics = await single_flight.do(
+        "statistics",
+        (server, catalog, schema, table, small_file_mb),
+        lambda: run_trino(server, load)
+    )
+    return conditional_json(request, {
+        **statistics,
+        "performance": {**statistics["performance"], "queries": queries}
+    }, etag)
+
+
+def load_table_statistics(trino_server, catalog, schema, table, small_file_mb=SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB):
+    try:
+        # One pass over $files and the compaction history, concurrently
+        probes = run_probes(trino_server, catalog, schema, {
+            "layout": lambda cursor: read_file_layout(cursor, catalog, schema, table, small_file_mb * 1024 * 1024),
+            "optimize": lambda cursor: read_last_optimize(cursor, catalog, schema, table),
+        })
+        return build_statistics(probes["layout"], probes["optimize"], small_file_mb)
 
     except TrinoUserError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except QueryCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
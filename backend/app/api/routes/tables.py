@@ -1,16 +1,40 @@
 # app/api/routes/tables.py
-from fastapi import APIRouter, HTTPException, Query
-from app.core.trino_client import TRINO_SERVERS, get_trino_connection
-from datetime import datetime
-import random
+import os
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.core.trino_client import TRINO_SERVERS, pooled_connection
+from app.core.iceberg_metadata import read_iceberg_table_summary, read_stats_row_count
+from app.core.cache import metadata_cache, schema_tag
+from app.core.deadlines import QueryCancelled, streaming_statements
+from app.core.executor import run_trino
+from app.core.responses import conditional_json
+from app.core.singleflight import single_flight
+from app.core.sql import sql_literal
+from app.core.streaming import RESPONSE_FORMATS, InvalidCursor, decode_cursor, encode_cursor, iter_rows, ndjson_response
+from trino.exceptions import TrinoUserError
 
 router = APIRouter()
 
+ROW_COUNT_MODES = ("metadata", "scan", "none")
+# Page size for JSON listings that read per-table metadata and were sent no limit
+TABLES_PAGE_SIZE = int(os.getenv("TABLES_PAGE_SIZE", 1000))
+
+def format_size_mb(size_bytes):
+    if size_bytes is None:
+        return None
+    return f"{round(size_bytes / (1024 * 1024), 2)} MB"
+
+
 @router.get("/tables", tags=["Tables"])
-def list_tables(
+async def list_tables(
+    request: Request,
     server: str = Query(...),
     catalog: str = Query(...),
-    schema: str = Query(...)
+    schema: str = Query(...),
+    row_count: str = Query("metadata", description="metadata | scan | none (names only)"),
+    limit: int = Query(None, ge=1, le=10000, description="Page size; TABLES_PAGE_SIZE when omitted, all tables for ndjson or row_count=none"),
+    page_cursor: str = Query(None, alias="cursor", description="next_cursor from the previous page"),
+    response_format: str = Query("json", alias="format", description="json | ndjson")
 ):
     server_info = TRINO_SERVERS.get(server)
 
@@ -20,46 +44,145 @@ def list_tables(
         raise HTTPException(status_code=400, detail="Catalog is required")
     if not schema:
         raise HTTPException(status_code=400, detail="Schema is required")
+    if row_count not in ROW_COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"row_count must be one of {', '.join(ROW_COUNT_MODES)}")
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(RESPONSE_FORMATS)}")
 
-    try:
-        conn = get_trino_connection(
-            host=server_info["host"],
-            port=server_info["port"],
-            user=server_info["user"],
-            catalog=catalog,
-            schema=schema
+    after = None
+    if page_cursor:
+        try:
+            after = decode_cursor(page_cursor)["after"]
+        except (InvalidCursor, KeyError):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    if response_format == "ndjson":
+        return ndjson_response(
+            server,
+            lambda: iter_tables(server_info, catalog, schema, row_count, after, limit),
+            heavy=row_count == "scan"
         )
 
-        cursor = conn.cursor()
-        cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
-
-        result = []
-        for row in tables:
-            table_name = row[0]
-            try:
-                cursor.execute(f"SELECT COUNT(*) FROM {schema}.{table_name}")
-                row_count = cursor.fetchone()[0]
-            except Exception:
-                row_count = None
-
-            # Dummy size for now (replace with actual size if you have metadata support)
-            size = f"{round(random.uniform(0.1, 50.0), 2)} MB" if row_count else None
-
-            # Dummy lastModified and snapshots
-            last_modified = datetime.now().isoformat()
-            snapshots = "ESTIMATED" if row_count else None
-
-            result.append({
-                "name": table_name,
-                "rows": row_count,
-                "size": size,
-                "lastModified": last_modified,
-                "snapshots": snapshots,
-                "description": "Fetched successfully" if row_count is not None else None
-            })
-
-        return {"tables": result}
+    if limit is None and row_count != "none":
+        # Each table costs metadata reads; an unbounded JSON page would hold
+        # the request (and the whole listing in memory) for the entire schema
+        limit = TABLES_PAGE_SIZE
+
+    def load():
+        return metadata_cache.get_or_load(
+            "tables",
+            (server, catalog, schema, row_count, after, limit),
+            lambda: load_tables(server_info, catalog, schema, row_count, after, limit),
+            tags=[schema_tag(server, catalog, schema)]
+        )
+
+    listing = await single_flight.do(
+        "tables",
+        (server, catalog, schema, row_count, after, limit),
+        lambda: run_trino(server, load, heavy=row_count == "scan")
+    )
+    return conditional_json(request, listing)
+
+
+def describe_table(cursor, catalog, schema, table_name, row_count):
+    if row_count == "none":
+        # Names only: size, snapshots and lastModified also come from the summary
+        return {
+            "name": table_name,
+            "rows": None,
+            "rowCountSource": None,
+            "size": None,
+            "lastModified": None,
+            "snapshots": None,
+            "description": None
+        }
+    summary = read_iceberg_table_summary(cursor, catalog, schema, table_name)
+
+    rows, source = None, None
+    if row_count == "metadata":
+        if summary is not None:
+            rows, source = summary["rows"], "metadata"
+        else:
+            rows = read_stats_row_count(cursor, catalog, schema, table_name)
+            source = "stats" if rows is not None else None
+    elif row_count == "scan":
+        try:
+            cursor.execute(f'SELECT COUNT(*) FROM "{catalog}"."{schema}"."{table_name}"')
+            rows, source = cursor.fetchone()[0], "scan"
+        except TrinoUserError:
+            rows = None
+
+    last_modified = summary["last_modified"] if summary else None
+
+    return {
+        "name": table_name,
+        "rows": rows,
+        "rowCountSource": source,
+        "size": format_size_mb(summary["size_bytes"]) if summary else None,
+        "lastModified": last_modified.isoformat() if last_modified else None,
+        "snapshots": summary["snapshot_count"] if summary else None,
+        "description": "Fetched successfully" if rows is not None else None
+    }
+
+
+def iter_tables(server_info, catalog, schema, row_count, after=None, limit=None):
+    """Yield table entries in name order, starting after ``after``.
+
+    Names are read with fetchmany() on one cursor while a second cursor on
+    the same connection reads each table's metadata, so nothing is held in
+    memory. With ``limit``, a final ``{"next_cursor": ...}`` item follows
+    when more tables remain.
+    """
+    where = f"table_schema = {sql_literal(schema)}"
+    if after is not None:
+        where += f" AND table_name > {sql_literal(after)}"
+    query = f"""
+        SELECT table_name
+        FROM "{catalog}".information_schema.tables
+        WHERE {where}
+        ORDER BY table_name
+    """
+    if limit is not None:
+        # One extra row tells us whether there is another page
+        query += f" LIMIT {limit + 1}"
+
+    with pooled_connection(server_info, catalog, schema) as conn:
+        names = conn.cursor()
+        details = conn.cursor()
+        with streaming_statements():
+            names.execute(query)
+        finished = False
+        try:
+            count, last_name = 0, None
+            for (table_name,) in iter_rows(names):
+                if limit is not None and count == limit:
+                    yield {"next_cursor": encode_cursor({"after": last_name})}
+                    break
+                yield describe_table(details, catalog, schema, table_name, row_count)
+                count, last_name = count + 1, table_name
+            else:
+                finished = True
+        finally:
+            if not finished:
+                # Stopped early (page full or client went away); close() ends
+                # the statement and cancels what is left of the listing
+                try:
+                    names.close()
+                except Exception as e:
+                    print(f"[WARN] Failed to cancel table listing: {e}")
+
+
+def load_tables(server_info, catalog, schema, row_count, after=None, limit=None):
+    try:
+        tables, next_cursor = [], None
+        for item in iter_tables(server_info, catalog, schema, row_count, after, limit):
+            if "next_cursor" in item:
+                next_cursor = item["next_cursor"]
+            else:
+                tables.append(item)
+        return {"tables": tables, "next_cursor": next_cursor}
 
+    except QueryCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from trino.exceptions import TrinoUserError
+
+from app.core.deadlines import current_scope
+from app.core.executor import run_trino
+from app.core.iceberg_metadata import read_current_snapshot_id
+from app.core.singleflight import single_flight
+from app.core.trino_client import pooled_connection
+
+CACHE_MAX_ENTRIES = int(os.getenv("METADATA_CACHE_MAX_ENTRIES", 2048))
+
+# Seconds each kind of result stays fresh; override with METADATA_CACHE_TTL_<NAME>
+DEFAULT_TTLS = {
+    "catalogs": 300,
+    "schemas": 120,
+    "tables": 60,
+    "metadata": 300,
+    "details": 300,
+    "snapshots": 300,
+    "snapshot_timeline": 300,
+    "statistics": 300,
+    "manifests": 300,
+    "ddl": 600,
+    "row_counts": 1800,
+}
+CACHE_TTLS = {
+    name: float(os.getenv(f"METADATA_CACHE_TTL_{name.upper()}", ttl))
+    for name, ttl in DEFAULT_TTLS.items()
+}
+
+
+def table_tag(server, catalog, schema, table):
+    return ("table", server, catalog, schema, table)
+
+
+def schema_tag(server, catalog, schema):
+    return ("schema", server, catalog, schema)
+
+
+class MetadataCache:
+    """Size-bounded LRU cache with per-namespace TTLs and tag invalidation.
+
+    Entries are keyed by (namespace, key). Tags group entries that must be
+    dropped together, e.g. everything computed for one table when its
+    snapshot changes or a maintenance action runs against it.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttls=None):
+        self.max_entries = max_entries
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (namespace, key) -> (value, expires_at, tags)
+        self._tagged = {}               # tag -> {(namespace, key)}
+        self._snapshots = {}            # table tag -> last seen snapshot_id
+        self._hits = {}
+        self._misses = {}
+        self._evictions = 0
+        self._invalidations = 0
+
+    def _drop(self, entry_key):
+        # Caller holds the lock
+        _, _, tags = self._entries.pop(entry_key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(entry_key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def get(self, namespace, key):
+        """Return (hit, value)."""
+        entry_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(entry_key)
+                self._hits[namespace] = self._hits.get(namespace, 0) + 1
+                return True, entry[0]
+            if entry is not None:
+                self._drop(entry_key)
+            self._misses[namespace] = self._misses.get(namespace, 0) + 1
+            return False, None
+
+    def set(self, namespace, key, value, tags=()):
+        entry_key = (namespace, key)
+        ttl = self.ttls.get(namespace, 60)
+        with self._lock:
+            if entry_key in self._entries:
+                self._drop(entry_key)
+            self._entries[entry_key] = (value, time.monotonic() + ttl, tuple(tags))
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def get_or_load(self, namespace, key, loader, tags=()):
+        hit, value = self.get(namespace, key)
+        if hit:
+            return value
+        value = loader()
+        scope = current_scope()
+        if scope is not None and (scope.cancelled or scope.cancellations):
+            # Built while some of the request's statements were cancelled
+            return value
+        self.set(namespace, key, value, tags)
+        return value
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for entry_key in list(self._tagged.get(tag, ())):
+                self._drop(entry_key)
+                self._invalidations += 1
+            self._snapshots.pop(tag, None)
+
+    def observe_snapshot(self, tag, snapshot_id):
+        """Drop a table's entries if its latest snapshot differs from the last one seen."""
+        with self._lock:
+            previous = self._snapshots.get(tag)
+            self._snapshots[tag] = snapshot_id
+        if previous is not None and previous != snapshot_id:
+            print(f"[INFO] Snapshot changed for {'.'.join(map(str, tag[2:]))}, invalidating cache")
+            self.invalidate_tag(tag)
+            with self._lock:
+                self._snapshots[tag] = snapshot_id
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+            self._snapshots.clear()
+
+    def stats(self):
+        with self._lock:
+            namespaces = {}
+            for namespace in set(self._hits) | set(self._misses):
+                hits = self._hits.get(namespace, 0)
+                misses = self._misses.get(namespace, 0)
+                namespaces[namespace] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+                }
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "namespaces": namespaces,
+            }
+
+
+metadata_cache = MetadataCache()
+
+
+def sync_table_snapshot(server, server_info, catalog, schema, table):
+    """Check the table's current snapshot and invalidate stale cache entries.
+
+    Returns the snapshot id, or None for tables without Iceberg metadata.
+    Cancellations and connection failures propagate.
+    """
+    tag = table_tag(server, catalog, schema, table)
+    try:
+        with pooled_connection(server_info, catalog, schema) as conn:
+            snapshot_id = read_current_snapshot_id(conn.cursor(), catalog, schema, table)
+    except TrinoUserError:
+        return None
+    metadata_cache.observe_snapshot(tag, snapshot_id)
+    return snapshot_id
+
+
+async def table_snapshot(server, server_info, catalog, schema, table):
+    """sync_table_snapshot() on the server's light lane, shared by concurrent requests for the table."""
+    return await single_flight.do(
+        "snapshot",
+        (server, catalog, schema, table),
+        lambda: run_trino(server, sync_table_snapshot, server, server_info, catalog, schema, table)
+    )
@@ -0,0 +1,306 @@
+# Per-statement Trino deadlines and cancellation of queries whose HTTP client went away
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Statements on the light lane (metadata lookups, run_probes) and everything
+# else (heavy lane, jobs, background collectors). 0 disables the deadline.
+TRINO_STATEMENT_TIMEOUT = float(os.getenv("TRINO_STATEMENT_TIMEOUT", 60))
+TRINO_HEAVY_STATEMENT_TIMEOUT = float(os.getenv("TRINO_HEAVY_STATEMENT_TIMEOUT", 3600))
+# Listings streamed page by page run as long as the client keeps reading
+TRINO_STREAM_STATEMENT_TIMEOUT = float(os.getenv("TRINO_STREAM_STATEMENT_TIMEOUT", TRINO_HEAVY_STATEMENT_TIMEOUT))
+# Trino enforces the deadline itself (query_max_execution_time); the client
+# cancels after this much extra time, e.g. for queries stuck in the queue
+TRINO_CANCEL_GRACE = float(os.getenv("TRINO_CANCEL_GRACE", 5))
+CANCEL_ON_DISCONNECT = os.getenv("TRINO_CANCEL_ON_DISCONNECT", "true").lower() in ("1", "true", "yes")
+
+DEADLINE = "deadline"
+CLIENT_DISCONNECT = "client_disconnect"
+
+_lane = ContextVar("trino_lane", default=None)
+_request_scope = ContextVar("query_scope", default=None)
+_expires = ContextVar("trino_statement_expires", default=None)
+
+
+class QueryCancelled(Exception):
+    def __init__(self, reason, timeout=None):
+        if reason == DEADLINE:
+            message = f"Trino statement exceeded its {timeout:g}s deadline and was cancelled"
+        else:
+            message = "Trino statement cancelled: the client disconnected"
+        super().__init__(message)
+        self.reason = reason
+        self.timeout = timeout
+
+
+def set_lane(lane):
+    """Mark the current context as running on an executor lane ("light" / "heavy")."""
+    _lane.set(lane)
+
+
+@contextmanager
+def statement_deadline(seconds):
+    """Statements started inside share one deadline ``seconds`` from now, whatever their lane."""
+    token = _expires.set(time.monotonic() + seconds if seconds > 0 else math.inf)
+    try:
+        yield
+    finally:
+        _expires.reset(token)
+
+
+def streaming_statements():
+    """Statements started inside are fetched at the client's pace and get the streaming deadline."""
+    return statement_deadline(TRINO_STREAM_STATEMENT_TIMEOUT)
+
+
+def statement_timeout():
+    expires = _expires.get()
+    if expires is not None:
+        # An already expired deadline still needs a positive timeout to be enforced
+        return 0 if expires == math.inf else max(expires - time.monotonic(), 0.001)
+    return TRINO_STATEMENT_TIMEOUT if _lane.get() == "light" else TRINO_HEAVY_STATEMENT_TIMEOUT
+
+
+def is_deadline_error(error):
+    # Raised by Trino when query_max_execution_time is exceeded
+    return getattr(error, "error_name", None) == "EXCEEDED_TIME_LIMIT"
+
+
+class Statement:
+    """One running Trino statement that may be cancelled."""
+
+    def __init__(self, cursor, timeout):
+        self.cursor = cursor
+        self.timeout = timeout
+        self.cancelled = None
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def cancel(self, reason):
+        with self._lock:
+            if self.finished or self.cancelled:
+                return
+            self.cancelled = reason
+        try:
+            self.cursor.cancel()
+        except Exception as e:
+            print(f"[WARN] Failed to cancel Trino statement ({reason}): {e}")
+
+    def finish(self):
+        with self._lock:
+            self.finished = True
+
+
+class StatementWatchdog:
+    """Single thread that cancels statements at their deadline.
+
+    Cancelling is a blocking HTTP call, so cancellations requested from the
+    event loop (client disconnects) are handed to this thread as well.
+    """
+
+    def __init__(self, grace=TRINO_CANCEL_GRACE):
+        self.grace = grace
+        self._cond = threading.Condition()
+        self._deadlines = []  # (expires, seq, statement)
+        self._cancels = []
+        self._seq = itertools.count()
+        self._thread = None
+
+    def _ensure_thread(self):
+        # Caller holds the lock
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="trino-watchdog", daemon=True)
+            self._thread.start()
+
+    def watch(self, cursor, timeout):
+        statement = Statement(cursor, timeout)
+        if timeout > 0:
+            with self._cond:
+                heapq.heappush(self._deadlines, (time.monotonic() + timeout + self.grace, next(self._seq), statement))
+                self._ensure_thread()
+                self._cond.notify()
+        return statement
+
+    def cancel(self, statements, reason):
+        with self._cond:
+            self._cancels.extend((statement, reason) for statement in statements)
+            self._ensure_thread()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._deadlines and self._deadlines[0][2].finished:
+                        heapq.heappop(self._deadlines)
+                    due = []
+                    while self._deadlines and self._deadlines[0][0] <= now:
+                        due.append((heapq.heappop(self._deadlines)[2], DEADLINE))
+                    due.extend(self._cancels)
+                    self._cancels.clear()
+                    if due:
+                        break
+                    self._cond.wait(self._deadlines[0][0] - now if self._deadlines else None)
+            for statement, reason in due:
+                statement.cancel(reason)
+
+    def pending(self):
+        with self._cond:
+            return sum(1 for _, _, statement in self._deadlines if not statement.finished)
+
+
+watchdog = StatementWatchdog()
+
+
+class QueryScope:
+    """Statements issued while serving one HTTP request."""
+
+    def __init__(self):
+        self.cancelled = None
+        self.cancellations = {}
+        self._statements = set()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def add(self, statement):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled(self.cancelled)
+            self._statements.add(statement)
+
+    def discard(self, statement):
+        with self._lock:
+            self._statements.discard(statement)
+
+    def record(self, reason):
+        with self._lock:
+            self.cancellations[reason] = self.cancellations.get(reason, 0) + 1
+
+    def on_cancel(self, callback):
+        """Call ``callback(reason)`` when the scope is cancelled (at once if it already is)."""
+        with self._lock:
+            reason = self.cancelled
+            if reason is None:
+                self._callbacks.append(callback)
+        if reason is not None:
+            callback(reason)
+
+    def cancel_all(self, reason):
+        with self._lock:
+            self.cancelled = reason
+            statements = list(self._statements)
+            callbacks, self._callbacks = self._callbacks, []
+        if statements:
+            watchdog.cancel(statements, reason)
+        for callback in callbacks:
+            callback(reason)
+        return len(statements)
+
+
+def current_scope():
+    return _request_scope.get()
+
+
+def use_scope(scope):
+    """Attribute statements started in the current context to ``scope``."""
+    _request_scope.set(scope)
+
+
+def start_statement(cursor):
+    """Register a statement about to be submitted; raises QueryCancelled if its request is gone."""
+    timeout = statement_timeout()
+    statement = watchdog.watch(cursor, timeout)
+    scope = _request_scope.get()
+    if scope is not None:
+        try:
+            scope.add(statement)
+        except QueryCancelled:
+            statement.finish()
+            raise
+    return statement
+
+
+def end_statement(statement, error=None):
+    """Mark a statement finished; returns the cancellation reason, if it was cancelled."""
+    statement.finish()
+    reason = statement.cancelled if error is not None else None
+    if reason is None and is_deadline_error(error):
+        reason = DEADLINE
+    scope = _request_scope.get()
+    if scope is not None:
+        scope.discard(statement)
+        if reason is not None:
+            scope.record(reason)
+    return reason
+
+
+def apply_session_deadline(session, base_properties, timeout):
+    """Send the deadline to Trino as query_max_execution_time for the next statement."""
+    if session is None:
+        return
+    properties = dict(base_properties)
+    if timeout > 0:
+        properties["query_max_execution_time"] = f"{math.ceil(timeout)}s"
+    if session.properties != properties:
+        session.properties = properties
+
+
+class CancelOnDisconnectMiddleware:
+    """Opens a QueryScope per HTTP request and cancels its Trino statements when the client disconnects."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query_scope = QueryScope()
+        use_scope(query_scope)
+        if not CANCEL_ON_DISCONNECT:
+            await self.app(scope, receive, send)
+            return
+
+        messages = asyncio.Queue()
+        response_complete = False
+        disconnected = False
+
+        async def listen():
+            # Keep reading so a disconnect is seen while a handler is still
+            # waiting on Trino; the app reads its messages from the queue
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    nonlocal disconnected
+                    disconnected = True
+                    if not response_complete:
+                        cancelled = query_scope.cancel_all(CLIENT_DISCONNECT)
+                        if cancelled:
+                            print(f"[INFO] Client disconnected from {scope['path']}, cancelled {cancelled} Trino statements")
+                    return
+
+        async def receive_wrapper():
+            if disconnected and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def send_wrapper(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        listener = asyncio.ensure_future(listen())
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            listener.cancel()
@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.deadlines import set_lane
+from app.core.trino_client import TRINO_SERVERS
+
+# Blocking trino.dbapi work runs here instead of FastAPI's shared threadpool,
+# split into a lane for cheap metadata lookups and one for long-running
+# scans and maintenance procedures.
+TRINO_LIGHT_WORKERS = int(os.getenv("TRINO_LIGHT_WORKERS", 32))
+TRINO_HEAVY_WORKERS = int(os.getenv("TRINO_HEAVY_WORKERS", 8))
+
+# Per-server limits on in-flight calls per lane; callers that cannot get a
+# slot within TRINO_QUEUE_TIMEOUT seconds are rejected as overloaded.
+TRINO_LIGHT_PER_SERVER = int(os.getenv("TRINO_LIGHT_PER_SERVER", 16))
+TRINO_HEAVY_PER_SERVER = int(os.getenv("TRINO_HEAVY_PER_SERVER", 4))
+TRINO_QUEUE_TIMEOUT = float(os.getenv("TRINO_QUEUE_TIMEOUT", 10))
+
+_executors = {
+    "light": ThreadPoolExecutor(max_workers=TRINO_LIGHT_WORKERS, thread_name_prefix="trino-light"),
+    "heavy": ThreadPoolExecutor(max_workers=TRINO_HEAVY_WORKERS, thread_name_prefix="trino-heavy"),
+}
+_lane_limits = {"light": TRINO_LIGHT_PER_SERVER, "heavy": TRINO_HEAVY_PER_SERVER}
+_limiters = {}
+_limiters_lock = threading.Lock()
+_in_flight = {}
+_rejected = {}
+
+
+class TrinoOverloaded(Exception):
+    def __init__(self, server, lane, retry_after=5):
+        super().__init__(f"Trino server {server} is busy ({lane} queue full), retry later")
+        self.server = server
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+def _limiter(server, lane):
+    if server not in TRINO_SERVERS:
+        # Limiters are never dropped, so only configured servers get one
+        raise ValueError(f"Unknown Trino server: {server}")
+    key = (server, lane)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = asyncio.Semaphore(_lane_limits[lane])
+        return _limiters[key]
+
+
+async def run_trino(server, func, *args, heavy=False, **kwargs):
+    """Run blocking Trino work for ``server`` on a bounded executor lane.
+
+    Raises TrinoOverloaded when the server's lane stays saturated for longer
+    than TRINO_QUEUE_TIMEOUT.
+    """
+    lane = "heavy" if heavy else "light"
+    limiter = _limiter(server, lane)
+    try:
+        await asyncio.wait_for(limiter.acquire(), timeout=TRINO_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _rejected[(server, lane)] = _rejected.get((server, lane), 0) + 1
+        raise TrinoOverloaded(server, lane)
+
+    _in_flight[(server, lane)] = _in_flight.get((server, lane), 0) + 1
+    loop = asyncio.get_running_loop()
+
+    def release():
+        _in_flight[(server, lane)] -= 1
+        limiter.release()
+
+    # Carry request-scoped context variables into the worker thread; the
+    # lane decides which statement deadline applies
+    context = contextvars.copy_context()
+    context.run(set_lane, lane)
+    call = functools.partial(context.run, func, *args, **kwargs)
+    try:
+        future = _executors[lane].submit(call)
+    except Exception:
+        release()
+        raise
+
+    def finished(done):
+        # Runs on the worker thread; hand the slot back on the event loop
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(release)
+
+    # The slot is held until the worker finishes, not until the caller stops
+    # waiting: a cancelled await leaves the blocking call running
+    future.add_done_callback(finished)
+    return await asyncio.wrap_future(future)
+
+
+def executor_stats():
+    return {
+        f"{server}/{lane}": {
+            "in_flight": _in_flight.get((server, lane), 0),
+            "limit": _lane_limits[lane],
+            "rejected": _rejected.get((server, lane), 0),
+        }
+        for server, lane in set(_in_flight) | set(_rejected)
+    }
+
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
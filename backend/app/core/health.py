@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from trino.dbapi import connect
+
+from app.core.trino_client import TRINO_SERVERS, TRINO_SOURCE
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("TRINO_HEALTH_CHECK_INTERVAL", 30))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("TRINO_HEALTH_CHECK_TIMEOUT", 5))
+HEALTH_HISTORY_SIZE = int(os.getenv("TRINO_HEALTH_HISTORY_SIZE", 60))
+
+
+def probe_server(server):
+    """SHOW CATALOGS on a fresh, short-timeout connection; returns the catalog count."""
+    conn = connect(
+        host=server["host"],
+        port=server["port"],
+        user=server["user"],
+        catalog="system",
+        schema="information_schema",
+        source=TRINO_SOURCE,
+        request_timeout=HEALTH_CHECK_TIMEOUT,
+        max_attempts=1
+    )
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SHOW CATALOGS")
+        return len(cursor.fetchall())
+    finally:
+        conn.close()
+
+
+class HealthMonitor:
+    """Probes every configured Trino server in the background.
+
+    All servers are checked concurrently every ``interval`` seconds; the
+    latest result and a bounded status history are kept per server so
+    /trino-servers can answer without touching the network.
+    """
+
+    def __init__(self, servers=TRINO_SERVERS, interval=HEALTH_CHECK_INTERVAL,
+                 history_size=HEALTH_HISTORY_SIZE, probe=probe_server):
+        self.servers = servers
+        self.interval = interval
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._state = {name: {"status": "unknown", "catalogs": None, "latency_ms": None,
+                              "last_checked": None, "last_connected": None, "error": None}
+                       for name in servers}
+        self._history = {name: deque(maxlen=history_size) for name in servers}
+        self._stop = threading.Event()
+        self._first_cycle = threading.Event()
+        self._thread = None
+
+    def check_server(self, name):
+        server = self.servers[name]
+        started = time.monotonic()
+        checked_at = datetime.now(timezone.utc)
+        try:
+            catalogs = self._probe(server)
+            status, error = "online", None
+        except Exception as e:
+            print(f"❌ Error connecting to {name}: {e}")
+            catalogs, status, error = None, "offline", str(e)
+        latency_ms = round((time.monotonic() - started) * 1000, 1)
+
+        with self._lock:
+            state = self._state[name]
+            state.update({
+                "status": status,
+                "catalogs": catalogs,
+                "latency_ms": latency_ms,
+                "last_checked": checked_at.isoformat(),
+                "error": error,
+            })
+            if status == "online":
+                state["last_connected"] = checked_at.isoformat()
+            self._history[name].append({
+                "checked_at": checked_at.isoformat(),
+                "status": status,
+                "latency_ms": latency_ms,
+            })
+
+    def check_all(self):
+        if not self.servers:
+            return
+        with ThreadPoolExecutor(max_workers=len(self.servers), thread_name_prefix="trino-health") as executor:
+            list(executor.map(self.check_server, self.servers))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_all()
+            self._first_cycle.set()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="trino-health-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def wait_for_first_cycle(self, timeout=HEALTH_CHECK_TIMEOUT):
+        return self._first_cycle.wait(timeout)
+
+    def snapshot(self, name):
+        with self._lock:
+            return dict(self._state[name])
+
+    def history(self, name):
+        with self._lock:
+            return list(self._history[name])
+
+
+health_monitor = HealthMonitor()
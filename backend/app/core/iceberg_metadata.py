@@ -0,0 +1,391 @@
+# Read-only probes against Iceberg metadata tables ($files, $snapshots, ...)
+from trino.exceptions import TrinoUserError
+
+from app.core.sql import sql_literal
+
+MB = 1024 * 1024
+
+# Data-file size histogram: (label, exclusive upper bound in bytes)
+FILE_SIZE_BUCKETS = (
+    ("<1MB", 1 * MB),
+    ("1-8MB", 8 * MB),
+    ("8-32MB", 32 * MB),
+    ("32-128MB", 128 * MB),
+    ("128-512MB", 512 * MB),
+    (">=512MB", None),
+)
+
+# $files content codes
+DATA_FILE, POSITION_DELETES, EQUALITY_DELETES = 0, 1, 2
+
+
+def read_iceberg_table_summary(cursor, catalog, schema, table):
+    """Row count, data size and last commit from Iceberg metadata tables only.
+
+    Returns None when the table has no ``$files``/``$snapshots`` (not Iceberg).
+    Row counts ignore delete files, so they are exact only for tables without
+    row-level deletes.
+    """
+    try:
+        cursor.execute(f'''
+            SELECT f.record_count, f.size_bytes, s.snapshot_count, s.last_committed_at
+            FROM (
+                SELECT
+                    SUM(record_count) FILTER (WHERE content = 0) AS record_count,
+                    SUM(file_size_in_bytes) AS size_bytes
+                FROM "{catalog}"."{schema}"."{table}$files"
+            ) f
+            CROSS JOIN (
+                SELECT COUNT(*) AS snapshot_count, MAX(committed_at) AS last_committed_at
+                FROM "{catalog}"."{schema}"."{table}$snapshots"
+            ) s
+        ''')
+        row = cursor.fetchone()
+    except TrinoUserError as e:
+        print(f"[WARN] No Iceberg metadata for {catalog}.{schema}.{table}: {e}")
+        return None
+
+    return {
+        "rows": row[0] or 0,
+        "size_bytes": row[1] or 0,
+        "snapshot_count": row[2],
+        "last_modified": row[3],
+    }
+
+
+def read_stats_row_count(cursor, catalog, schema, table):
+    """Connector row count estimate from SHOW STATS (None when unknown)."""
+    try:
+        cursor.execute(f'SHOW STATS FOR "{catalog}"."{schema}"."{table}"')
+        for row in cursor.fetchall():
+            # The summary row has a NULL column_name and carries row_count
+            if row[0] is None and row[4] is not None:
+                return int(row[4])
+    except TrinoUserError as e:
+        print(f"[WARN] SHOW STATS failed for {catalog}.{schema}.{table}: {e}")
+    return None
+
+
+def read_iceberg_properties(cursor, catalog, schema, table):
+    """Table properties from ``$properties`` as a dict (raises if not Iceberg)."""
+    cursor.execute(f'SELECT key, value FROM "{catalog}"."{schema}"."{table}$properties"')
+    return {key: value for key, value in cursor.fetchall()}
+
+
+def iceberg_file_format(properties):
+    # Iceberg writes Parquet unless write.format.default says otherwise
+    return (properties.get("write.format.default") or "PARQUET").upper()
+
+
+def read_files_aggregate(cursor, catalog, schema, table):
+    """One pass over ``$files`` with everything the overview and statistics need."""
+    cursor.execute(f'''
+        SELECT
+            COUNT(*) AS file_count,
+            SUM(record_count) FILTER (WHERE content = 0) AS record_count,
+            SUM(file_size_in_bytes) AS size_bytes,
+            AVG(file_size_in_bytes) AS avg_file_size_bytes
+        FROM "{catalog}"."{schema}"."{table}$files"
+    ''')
+    row = cursor.fetchone()
+    return {
+        "file_count": row[0],
+        "record_count": row[1] or 0,
+        "size_bytes": row[2] or 0,
+        "avg_file_size_bytes": row[3],
+    }
+
+
+def is_missing_partition_column(error):
+    # Unpartitioned tables have no partition column in $files
+    return getattr(error, "error_name", None) == "COLUMN_NOT_FOUND" and "'partition'" in str(error)
+
+
+def read_file_layout(cursor, catalog, schema, table, small_file_bytes):
+    """Per-partition file layout from one pass over ``$files``.
+
+    Returns one dict per partition with data/delete file counts and bytes,
+    small data files and the data-file size histogram. Unpartitioned tables
+    yield a single entry whose partition is None.
+    """
+    buckets, lower = [], 0
+    for label, upper in FILE_SIZE_BUCKETS:
+        condition = f"content = {DATA_FILE} AND file_size_in_bytes >= {lower}"
+        if upper is not None:
+            condition += f" AND file_size_in_bytes < {upper}"
+        buckets.append(f"COUNT(*) FILTER (WHERE {condition})")
+        lower = upper
+    aggregates = ",\n            ".join([
+        f"COUNT(*) FILTER (WHERE content = {DATA_FILE})",
+        f"COALESCE(SUM(file_size_in_bytes) FILTER (WHERE content = {DATA_FILE}), 0)",
+        f"COALESCE(SUM(record_count) FILTER (WHERE content = {DATA_FILE}), 0)",
+        f"COUNT(*) FILTER (WHERE content = {DATA_FILE} AND file_size_in_bytes < {small_file_bytes})",
+        f"COUNT(*) FILTER (WHERE content = {POSITION_DELETES})",
+        f"COUNT(*) FILTER (WHERE content = {EQUALITY_DELETES})",
+        f"COALESCE(SUM(file_size_in_bytes) FILTER (WHERE content <> {DATA_FILE}), 0)",
+        f"COALESCE(SUM(record_count) FILTER (WHERE content = {POSITION_DELETES}), 0)",
+    ] + buckets)
+
+    def entry(partition, row):
+        return {
+            "partition": partition,
+            "data_files": row[0],
+            "data_bytes": row[1],
+            "record_count": row[2],
+            "small_files": row[3],
+            "position_delete_files": row[4],
+            "equality_delete_files": row[5],
+            "delete_bytes": row[6],
+            "position_deletes": row[7],
+            "histogram": dict(zip((label for label, _ in FILE_SIZE_BUCKETS), row[8:])),
+        }
+
+    try:
+        cursor.execute(f'''
+            SELECT partition, {aggregates}
+            FROM "{catalog}"."{schema}"."{table}$files"
+            GROUP BY partition
+        ''')
+        return [entry(row[0], row[1:]) for row in cursor.fetchall()]
+    except TrinoUserError as e:
+        if not is_missing_partition_column(e):
+            raise
+    cursor.execute(f'SELECT {aggregates} FROM "{catalog}"."{schema}"."{table}$files"')
+    return [entry(None, cursor.fetchone())]
+
+
+def file_layout_totals(partitions):
+    """read_files_aggregate()-shaped totals from a read_file_layout() result."""
+    data_files = sum(partition["data_files"] for partition in partitions)
+    delete_files = sum(
+        partition["position_delete_files"] + partition["equality_delete_files"] for partition in partitions
+    )
+    size_bytes = sum(partition["data_bytes"] + partition["delete_bytes"] for partition in partitions)
+    file_count = data_files + delete_files
+    return {
+        "file_count": file_count,
+        "record_count": sum(partition["record_count"] for partition in partitions),
+        "size_bytes": size_bytes,
+        "avg_file_size_bytes": size_bytes / file_count if file_count else None,
+    }
+
+
+def read_last_optimize(cursor, catalog, schema, table):
+    """Latest compaction among the retained snapshots.
+
+    Compaction (``optimize``) commits with operation ``replace``; so do
+    manifest rewrites, which are rare enough not to skew the answer.
+    """
+    cursor.execute(f'''
+        SELECT
+            MAX(committed_at) FILTER (WHERE operation = 'replace'),
+            COUNT(*) FILTER (WHERE operation = 'replace')
+        FROM "{catalog}"."{schema}"."{table}$snapshots"
+    ''')
+    row = cursor.fetchone()
+    return {"last_optimized_at": row[0], "optimize_count": row[1]}
+
+
+def read_manifest_summary(cursor, catalog, schema, table, small_manifest_bytes):
+    """Aggregate of the current snapshot's manifests from ``$manifests``."""
+    cursor.execute(f'''
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(length), 0),
+            MIN(length),
+            MAX(length),
+            approx_percentile(length, 0.5),
+            COUNT_IF(length < {int(small_manifest_bytes)}),
+            COALESCE(SUM(added_data_files_count), 0),
+            COALESCE(SUM(existing_data_files_count), 0),
+            COALESCE(SUM(deleted_data_files_count), 0),
+            COUNT_IF(added_data_files_count > 0 AND existing_data_files_count = 0),
+            AVG(CAST(added_data_files_count AS DOUBLE) / NULLIF(added_data_files_count + existing_data_files_count, 0)),
+            COUNT(DISTINCT partition_spec_id)
+        FROM "{catalog}"."{schema}"."{table}$manifests"
+    ''')
+    row = cursor.fetchone()
+    return {
+        "manifests": row[0],
+        "total_bytes": row[1],
+        "min_bytes": row[2],
+        "max_bytes": row[3],
+        "median_bytes": row[4],
+        "small_manifests": row[5],
+        "added_data_files": row[6],
+        "existing_data_files": row[7],
+        "deleted_data_files": row[8],
+        # Manifests holding only files added by their own commit: one per
+        # append that has never been merged into a larger manifest
+        "append_only_manifests": row[9],
+        "avg_added_ratio": row[10],
+        "partition_specs": row[11],
+    }
+
+
+def read_manifests(cursor, catalog, schema, table, limit=50):
+    """Manifests tracking the fewest data files first (the ones a rewrite would merge)."""
+    cursor.execute(f'''
+        SELECT path, length, partition_spec_id, added_snapshot_id,
+               added_data_files_count, existing_data_files_count, deleted_data_files_count
+        FROM "{catalog}"."{schema}"."{table}$manifests"
+        ORDER BY added_data_files_count + existing_data_files_count, length
+        LIMIT {int(limit)}
+    ''')
+    manifests = []
+    for path, length, spec_id, snapshot_id, added, existing, deleted in cursor.fetchall():
+        live = (added or 0) + (existing or 0)
+        manifests.append({
+            "path": path,
+            "size_bytes": length,
+            "partition_spec_id": spec_id,
+            "added_snapshot_id": snapshot_id,
+            "added_data_files": added,
+            "existing_data_files": existing,
+            "deleted_data_files": deleted,
+            "added_ratio": round(added / live, 3) if live else None,
+        })
+    return manifests
+
+
+def read_snapshots(cursor, catalog, schema, table, limit=50):
+    """Most recent snapshots, the total count and the last compaction, in one query."""
+    cursor.execute(f'''
+        SELECT
+            snapshot_id,
+            committed_at,
+            operation,
+            summary,
+            COUNT(*) OVER () AS snapshot_count,
+            MAX(CASE WHEN operation = 'replace' THEN committed_at END) OVER () AS last_optimized_at,
+            COUNT(CASE WHEN operation = 'replace' THEN 1 END) OVER () AS optimize_count
+        FROM "{catalog}"."{schema}"."{table}$snapshots"
+        ORDER BY committed_at DESC
+        LIMIT {limit}
+    ''')
+    rows = cursor.fetchall()
+    return {
+        "snapshots": [
+            {
+                "snapshot_id": row[0],
+                "committed_at": row[1],
+                "operation": row[2],
+                "summary": row[3]
+            }
+            for row in rows
+        ],
+        "snapshot_count": rows[0][4] if rows else 0,
+        "last_committed_at": rows[0][1] if rows else None,
+        "last_optimized_at": rows[0][5] if rows else None,
+        "optimize_count": rows[0][6] if rows else 0,
+    }
+
+
+def snapshot_page_query(catalog, schema, table, limit=None, before=None):
+    """Snapshots newest first, keyset-paged on (committed_at, snapshot_id).
+
+    ``before`` is the (committed_at, snapshot_id) of the last snapshot on
+    the previous page.
+    """
+    query = f'''
+        SELECT snapshot_id, committed_at, operation, summary
+        FROM "{catalog}"."{schema}"."{table}$snapshots"
+    '''
+    if before is not None:
+        committed_at, snapshot_id = before
+        literal = sql_literal(committed_at)
+        query += (f" WHERE committed_at < {literal}"
+                  f" OR (committed_at = {literal} AND snapshot_id < {int(snapshot_id)})")
+    query += " ORDER BY committed_at DESC, snapshot_id DESC"
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    return query
+
+
+def snapshot_from_row(row):
+    return {"snapshot_id": row[0], "committed_at": row[1], "operation": row[2], "summary": row[3]}
+
+
+TIMELINE_GRANULARITIES = ("hour", "day")
+
+# Series name -> Iceberg snapshot summary key. Per-commit deltas are summed
+# per bucket; running totals keep the value of the bucket's last snapshot.
+TIMELINE_DELTAS = {
+    "added_records": "added-records",
+    "deleted_records": "deleted-records",
+    "added_files": "added-data-files",
+    "removed_files": "deleted-data-files",
+    "added_bytes": "added-files-size",
+    "removed_bytes": "removed-files-size",
+}
+TIMELINE_TOTALS = {
+    "total_records": "total-records",
+    "total_files": "total-data-files",
+    "total_size_bytes": "total-files-size",
+}
+
+
+def snapshot_timeline_query(catalog, schema, table, granularity, since_snapshot_id=None):
+    """Snapshot summary metrics aggregated per hour/day, oldest bucket first.
+
+    With ``since_snapshot_id`` only snapshots committed after that one are
+    aggregated. If it is no longer in ``$snapshots`` (expired) the whole
+    history is returned and ``since_found`` is false.
+    """
+    def metric(key):
+        return f"TRY_CAST(element_at(s.summary, '{key}') AS BIGINT)"
+
+    columns = [f"SUM({metric(key)}) AS {name}" for name, key in TIMELINE_DELTAS.items()]
+    columns += [f"MAX_BY({metric(key)}, s.committed_at) AS {name}" for name, key in TIMELINE_TOTALS.items()]
+    metrics = ",\n            ".join(columns)
+    since = "NULL" if since_snapshot_id is None else str(int(since_snapshot_id))
+    return f'''
+        WITH since AS (
+            SELECT MAX(committed_at) AS committed_at
+            FROM "{catalog}"."{schema}"."{table}$snapshots"
+            WHERE snapshot_id = {since}
+        )
+        SELECT
+            date_trunc('{granularity}', s.committed_at) AS bucket,
+            COUNT(*) AS snapshots,
+            MAX_BY(s.snapshot_id, s.committed_at) AS last_snapshot_id,
+            BOOL_OR(since.committed_at IS NOT NULL) AS since_found,
+            {metrics}
+        FROM "{catalog}"."{schema}"."{table}$snapshots" s
+        CROSS JOIN since
+        WHERE since.committed_at IS NULL OR s.committed_at > since.committed_at
+        GROUP BY 1
+        ORDER BY 1
+    '''
+
+
+def read_snapshot_timeline(cursor, catalog, schema, table, granularity="day", since_snapshot_id=None):
+    """Columnar timeline: bucket start times plus one list per series."""
+    cursor.execute(snapshot_timeline_query(catalog, schema, table, granularity, since_snapshot_id))
+    rows = cursor.fetchall()
+    names = ["snapshots", *TIMELINE_DELTAS, *TIMELINE_TOTALS]
+    series = {name: [] for name in names}
+    for row in rows:
+        values = (row[1], *row[4:])
+        for name, value in zip(names, values):
+            series[name].append(value)
+    since_found = bool(rows[0][3]) if rows else since_snapshot_id is not None
+    return {
+        "buckets": [row[0] for row in rows],
+        "series": series,
+        "latest_snapshot_id": rows[-1][2] if rows else since_snapshot_id,
+        # An unknown since_snapshot_id resets the client to the full history
+        "since_snapshot_found": since_found if since_snapshot_id is not None else None,
+    }
+
+
+def read_current_snapshot_id(cursor, catalog, schema, table):
+    """Latest snapshot id of an Iceberg table (cheap; raises if not Iceberg)."""
+    cursor.execute(f'''
+        SELECT snapshot_id
+        FROM "{catalog}"."{schema}"."{table}$snapshots"
+        ORDER BY committed_at DESC
+        LIMIT 1
+    ''')
+    row = cursor.fetchone()
+    return row[0] if row else None
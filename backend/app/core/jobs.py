@@ -0,0 +1,280 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from trino.exceptions import TrinoUserError
+
+from app.core.deadlines import QueryCancelled
+from app.core.maintenance import action_query, execute_action
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 8))
+# Shared by all jobs; a job's own max_per_server / max_per_catalog can only lower them
+JOB_MAX_PER_SERVER = int(os.getenv("JOB_MAX_PER_SERVER", 4))
+JOB_MAX_PER_CATALOG = int(os.getenv("JOB_MAX_PER_CATALOG", 2))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", 30))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", 200))
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled", "skipped")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class MaintenanceJob:
+    """A list of tables, each run through the same sequence of actions.
+
+    Actions for one table run in order; different tables run in parallel up
+    to the job's per-server and per-catalog limits, and within the limits
+    shared by every job on the same server and catalog.
+    """
+
+    def __init__(self, server, server_info, tables, actions, older_than=7,
+                 max_per_server=JOB_MAX_PER_SERVER, max_per_catalog=JOB_MAX_PER_CATALOG, max_retries=1):
+        self.id = uuid.uuid4().hex[:12]
+        self.server = server
+        self.server_info = server_info
+        self.actions = list(actions)
+        self.older_than = older_than
+        self.max_per_server = max_per_server
+        self.max_per_catalog = max_per_catalog
+        self.max_retries = max_retries
+        self.status = "queued"
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._cursors = {}
+        self.tasks = [
+            {
+                "catalog": catalog,
+                "schema": schema,
+                "table": table,
+                "status": "queued",
+                "steps": [
+                    {"action": action, "status": "queued", "attempts": 0, "result": None, "error": None,
+                     "started_at": None, "finished_at": None}
+                    for action in self.actions
+                ]
+            }
+            for catalog, schema, table in tables
+        ]
+
+    def progress(self):
+        with self._lock:
+            steps = [step for task in self.tasks for step in task["steps"]]
+            done = sum(1 for step in steps if step["status"] in TERMINAL_STATES)
+            return {
+                "total_steps": len(steps),
+                "completed_steps": done,
+                "failed_steps": sum(1 for step in steps if step["status"] == "failed"),
+                "percent": round(100 * done / len(steps), 1) if steps else 100.0,
+            }
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "server": self.server,
+            "actions": self.actions,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "tables": len(self.tasks),
+            "progress": self.progress(),
+        }
+
+    def detail(self):
+        with self._lock:
+            tasks = [{**task, "steps": [dict(step) for step in task["steps"]]} for task in self.tasks]
+        return {**self.summary(), "older_than": self.older_than, "max_per_server": self.max_per_server,
+                "max_per_catalog": self.max_per_catalog, "max_retries": self.max_retries, "tasks": tasks}
+
+
+class JobScheduler:
+    """Queues maintenance jobs and runs their table tasks on a shared worker pool."""
+
+    def __init__(self, workers=JOB_WORKERS, history_size=JOB_HISTORY_SIZE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="maintenance-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.history_size = history_size
+        # Tables running per server / catalog (all jobs) and per job / job catalog
+        self._slots = threading.Condition()
+        self._running = {}
+
+    def submit(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history_size:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest.status not in TERMINAL_STATES + ("partial",):
+                    break
+                del self._jobs[oldest_id]
+        threading.Thread(target=self._dispatch, args=(job,), name=f"job-{job.id}", daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return [job.summary() for job in reversed(list(self._jobs.values()))]
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with job._lock:
+            cursors = list(job._cursors.values())
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception as e:
+                print(f"[WARN] Failed to cancel query for job {job_id}: {e}")
+        return job
+
+    def _claim(self, job, catalog):
+        """Take every slot one table needs, or none of them; caller holds _slots."""
+        limits = {
+            ("server", job.server): JOB_MAX_PER_SERVER,
+            ("catalog", job.server, catalog): JOB_MAX_PER_CATALOG,
+            ("job", job.id): job.max_per_server,
+            ("job", job.id, catalog): job.max_per_catalog,
+        }
+        if any(self._running.get(key, 0) >= limit for key, limit in limits.items()):
+            return None
+        for key in limits:
+            self._running[key] = self._running.get(key, 0) + 1
+        return list(limits)
+
+    def _release(self, slots):
+        with self._slots:
+            for key in slots:
+                self._running[key] -= 1
+                if not self._running[key]:
+                    del self._running[key]
+            self._slots.notify_all()
+
+    def _dispatch(self, job):
+        job.status = "running"
+        job.started_at = _now()
+        pending = list(enumerate(job.tasks))
+        futures = []
+
+        while pending and not job.cancel_event.is_set():
+            # Start the first table whose server and catalog both have room,
+            # so a busy catalog does not hold up tables in other catalogs
+            with self._slots:
+                for position, (index, task) in enumerate(pending):
+                    slots = self._claim(job, task["catalog"])
+                    if slots is not None:
+                        del pending[position]
+                        break
+                else:
+                    # Wait for a release, but keep checking for cancellation
+                    self._slots.wait(0.5)
+                    continue
+
+            def run(task=task, index=index, slots=slots):
+                try:
+                    self._run_task(job, index, task)
+                finally:
+                    self._release(slots)
+
+            futures.append(self._executor.submit(run))
+
+        for future in futures:
+            future.result()
+        self._finish(job)
+
+    def _run_task(self, job, index, task):
+        task["status"] = "running"
+        for step in task["steps"]:
+            if job.cancel_event.is_set():
+                break
+            self._run_step(job, index, task, step)
+            if step["status"] == "failed":
+                # Later steps depend on the table being healthy; stop here
+                break
+
+        with job._lock:
+            for step in task["steps"]:
+                if step["status"] == "queued":
+                    step["status"] = "cancelled" if job.cancel_event.is_set() else "skipped"
+            statuses = {step["status"] for step in task["steps"]}
+            if "failed" in statuses:
+                task["status"] = "failed"
+            elif "cancelled" in statuses:
+                task["status"] = "cancelled"
+            else:
+                task["status"] = "succeeded"
+
+    def _run_step(self, job, index, task, step):
+        query = action_query(step["action"], task["catalog"], task["schema"], task["table"], older_than=job.older_than)
+        step["status"] = "running"
+        step["started_at"] = _now()
+
+        def track(cursor):
+            with job._lock:
+                job._cursors[index] = cursor
+
+        while True:
+            step["attempts"] += 1
+            try:
+                result = execute_action(job.server, job.server_info, task["catalog"], task["schema"],
+                                        task["table"], query, on_cursor=track)
+                if result == "PROCEDURE_NOT_FOUND":
+                    step["status"], step["result"] = "skipped", "procedure not supported or not an Iceberg table"
+                else:
+                    step["status"] = "succeeded"
+                    step["result"] = result[0] if isinstance(result, (list, tuple)) and result else None
+                break
+            except Exception as e:
+                step["error"] = str(e)
+                if job.cancel_event.is_set():
+                    step["status"] = "cancelled"
+                    break
+                # Bad SQL or a missing table will not get better on retry, and
+                # a statement cancelled at its deadline would only run out of time again
+                if isinstance(e, (TrinoUserError, QueryCancelled)) or step["attempts"] > job.max_retries:
+                    step["status"] = "failed"
+                    break
+                print(f"[WARN] Job {job.id} {step['action']} on {task['table']} failed, retrying: {e}")
+                if job.cancel_event.wait(JOB_RETRY_BACKOFF * step["attempts"]):
+                    step["status"] = "cancelled"
+                    break
+            finally:
+                with job._lock:
+                    job._cursors.pop(index, None)
+        step["finished_at"] = _now()
+
+    def _finish(self, job):
+        statuses = {task["status"] for task in job.tasks}
+        if job.cancel_event.is_set():
+            for task in job.tasks:
+                if task["status"] == "queued":
+                    task["status"] = "cancelled"
+                    for step in task["steps"]:
+                        step["status"] = "cancelled"
+            job.status = "cancelled"
+        elif statuses <= {"succeeded"}:
+            job.status = "succeeded"
+        elif "succeeded" in statuses:
+            job.status = "partial"
+        else:
+            job.status = "failed"
+        job.finished_at = _now()
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            if job.status in ("queued", "running"):
+                self.cancel(job.id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,52 @@
+# Iceberg maintenance procedures shared by /actions/* and the job scheduler
+from trino.exceptions import TrinoUserError
+
+from app.core.cache import metadata_cache, schema_tag, table_tag
+from app.core.trino_client import pooled_connection
+
+MAINTENANCE_ACTIONS = ("expire_snapshots", "remove_orphan_files", "optimize", "rewrite_manifests")
+
+
+def action_query(action, catalog, schema, table, older_than=None):
+    if action == "expire_snapshots":
+        return f"""
+            CALL system.expire_snapshots(
+                '{catalog}',
+                '{schema}',
+                '{table}',
+                TIMESTAMP 'now' - INTERVAL '{int(older_than)}' day
+            )
+        """
+    if action == "remove_orphan_files":
+        return f"CALL system.remove_orphan_files('{catalog}.{schema}.{table}')"
+    if action == "optimize":
+        return f"CALL system.optimize('{catalog}.{schema}.{table}')"
+    if action == "rewrite_manifests":
+        # Trino's Iceberg connector exposes manifest rewrites as a table procedure
+        return f'ALTER TABLE "{catalog}"."{schema}"."{table}" EXECUTE optimize_manifests'
+    raise ValueError(f"Unknown maintenance action: {action}")
+
+
+def execute_action(server, server_info, catalog, schema, table, query, on_cursor=None):
+    """Run a maintenance statement and drop cached metadata for the table.
+
+    Returns the first result row (or True), or "PROCEDURE_NOT_FOUND" when the
+    connector does not support the procedure. ``on_cursor`` receives the
+    cursor before execution so callers can cancel or inspect the query.
+    """
+    try:
+        with pooled_connection(server_info, catalog, schema) as conn:
+            cursor = conn.cursor()
+            if on_cursor is not None:
+                on_cursor(cursor)
+            cursor.execute(query)
+            result = cursor.fetchone()
+        return result if result else True
+    except TrinoUserError as e:
+        if "PROCEDURE_NOT_FOUND" in str(e):
+            return "PROCEDURE_NOT_FOUND"
+        raise
+    finally:
+        # Maintenance rewrites table metadata; drop anything cached for it
+        metadata_cache.invalidate_tag(table_tag(server, catalog, schema, table))
+        metadata_cache.invalidate_tag(schema_tag(server, catalog, schema))
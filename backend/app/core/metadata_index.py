@@ -0,0 +1,304 @@
+import difflib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+
+from trino.exceptions import TrinoUserError
+
+from app.core.iceberg_metadata import read_current_snapshot_id, read_iceberg_table_summary
+from app.core.trino_client import TRINO_SERVERS, pooled_connection
+
+METADATA_INDEX_PATH = os.getenv("METADATA_INDEX_PATH", "metadata_index.db")
+METADATA_CRAWL_INTERVAL = float(os.getenv("METADATA_CRAWL_INTERVAL", 3600))
+# Crawling reads every table's metadata on every server, so it is opt-in
+METADATA_CRAWLER_ENABLED = os.getenv("METADATA_CRAWLER_ENABLED", "false").lower() in ("1", "true", "yes")
+
+SKIPPED_SCHEMAS = ("information_schema",)
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS indexed_tables (
+    server TEXT NOT NULL,
+    catalog TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    table_name TEXT NOT NULL COLLATE NOCASE,
+    table_type TEXT,
+    row_count INTEGER,
+    size_bytes INTEGER,
+    snapshot_id INTEGER,
+    last_modified TEXT,
+    crawled_at TEXT NOT NULL,
+    PRIMARY KEY (server, catalog, schema_name, table_name)
+);
+CREATE TABLE IF NOT EXISTS indexed_columns (
+    server TEXT NOT NULL,
+    catalog TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL COLLATE NOCASE,
+    data_type TEXT,
+    ordinal INTEGER,
+    PRIMARY KEY (server, catalog, schema_name, table_name, column_name)
+);
+CREATE INDEX IF NOT EXISTS idx_tables_name ON indexed_tables (table_name);
+CREATE INDEX IF NOT EXISTS idx_columns_name ON indexed_columns (column_name);
+"""
+
+
+# Candidates read from SQLite per kind before scoring
+SEARCH_CANDIDATES = 1000
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fuzzy_pattern(query):
+    # "ordsum" matches "orders_summary": every character, in order
+    return "%" + "%".join(_escape_like(c) for c in query) + "%"
+
+
+def _rank_sql(column):
+    # Mirrors _score's tiers so the candidate LIMIT keeps the best matches:
+    # exact, prefix, substring, then fuzzy; shorter names first within a tier
+    return (
+        f"CASE WHEN {column} = ? THEN 0 "
+        f"WHEN {column} LIKE ? ESCAPE '\\' THEN 1 "
+        f"WHEN {column} LIKE ? ESCAPE '\\' THEN 2 ELSE 3 END, length({column})"
+    )
+
+
+def _score(query, name):
+    query, name = query.lower(), name.lower()
+    if name == query:
+        return 1.0
+    if name.startswith(query):
+        return 0.9
+    if query in name:
+        return 0.8
+    return round(0.7 * difflib.SequenceMatcher(None, query, name).ratio(), 4)
+
+
+class MetadataIndex:
+    """Local SQLite index of catalogs, schemas, tables and columns.
+
+    Filled by an incremental crawler: table statistics and columns are only
+    re-read for tables whose latest Iceberg snapshot changed since the last
+    crawl (or that are new). Tables without snapshots have nothing to
+    compare, so their columns are re-read on every crawl.
+    """
+
+    def __init__(self, path=METADATA_INDEX_PATH, servers=TRINO_SERVERS, interval=METADATA_CRAWL_INTERVAL):
+        self.path = path
+        self.servers = servers
+        self.interval = interval
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._status = {"running": False, "last_started": None, "last_finished": None,
+                        "tables_seen": 0, "tables_refreshed": 0, "errors": []}
+        self._initialized = False
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA_SQL)
+            self._initialized = True
+        return db
+
+    # --- crawling ---
+
+    def _known_snapshots(self, db, server, catalog):
+        rows = db.execute(
+            "SELECT schema_name, table_name, snapshot_id FROM indexed_tables WHERE server = ? AND catalog = ?",
+            (server, catalog)
+        ).fetchall()
+        return {(row[0], row[1].lower()): row[2] for row in rows}
+
+    def crawl_catalog(self, server, server_info, catalog):
+        """Re-index one catalog; returns (tables_seen, tables_refreshed)."""
+        crawled_at = datetime.now(timezone.utc).isoformat()
+        with pooled_connection(server_info, catalog, "information_schema") as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT table_schema, table_name, table_type FROM "{catalog}".information_schema.tables')
+            tables = [row for row in cursor.fetchall() if row[0] not in SKIPPED_SCHEMAS]
+
+            with closing(self._connect()) as db:
+                known = self._known_snapshots(db, server, catalog)
+
+            changed = []
+            for schema, table, table_type in tables:
+                try:
+                    snapshot_id = read_current_snapshot_id(cursor, catalog, schema, table)
+                except TrinoUserError:
+                    snapshot_id = None
+                key = (schema, table.lower())
+                if key not in known or snapshot_id is None or known[key] != snapshot_id:
+                    changed.append((schema, table, table_type, snapshot_id))
+
+            refreshed_tables = []
+            for schema, table, table_type, snapshot_id in changed:
+                summary = read_iceberg_table_summary(cursor, catalog, schema, table) if snapshot_id is not None else None
+                last_modified = summary["last_modified"] if summary else None
+                refreshed_tables.append((
+                    server, catalog, schema, table, table_type,
+                    summary["rows"] if summary else None,
+                    summary["size_bytes"] if summary else None,
+                    snapshot_id,
+                    last_modified.isoformat() if last_modified else None,
+                    crawled_at
+                ))
+
+            columns = []
+            if changed:
+                changed_keys = {(schema, table) for schema, table, _, _ in changed}
+                cursor.execute(f'''
+                    SELECT table_schema, table_name, column_name, data_type, ordinal_position
+                    FROM "{catalog}".information_schema.columns
+                ''')
+                columns = [
+                    (server, catalog, row[0], row[1], row[2], row[3], row[4])
+                    for row in cursor.fetchall()
+                    if (row[0], row[1]) in changed_keys
+                ]
+
+        seen = {(schema, table.lower()) for schema, table, _ in tables}
+        with self._write_lock, closing(self._connect()) as db, db:
+            for schema, table, *_ in changed:
+                db.execute(
+                    "DELETE FROM indexed_columns WHERE server = ? AND catalog = ? AND schema_name = ? AND table_name = ?",
+                    (server, catalog, schema, table)
+                )
+            db.executemany(
+                "INSERT OR REPLACE INTO indexed_tables VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", refreshed_tables
+            )
+            db.executemany("INSERT OR REPLACE INTO indexed_columns VALUES (?, ?, ?, ?, ?, ?, ?)", columns)
+            for schema, table in set(known) - seen:
+                db.execute(
+                    "DELETE FROM indexed_tables WHERE server = ? AND catalog = ? AND schema_name = ? AND table_name = ?",
+                    (server, catalog, schema, table)
+                )
+                db.execute(
+                    "DELETE FROM indexed_columns WHERE server = ? AND catalog = ? AND schema_name = ? "
+                    "AND table_name = ? COLLATE NOCASE",
+                    (server, catalog, schema, table)
+                )
+        return len(tables), len(changed)
+
+    def crawl(self):
+        self._status.update({"running": True, "last_started": datetime.now(timezone.utc).isoformat(),
+                             "tables_seen": 0, "tables_refreshed": 0, "errors": []})
+        try:
+            for server, server_info in self.servers.items():
+                try:
+                    with pooled_connection(server_info, "system", "information_schema") as conn:
+                        cursor = conn.cursor()
+                        cursor.execute("SHOW CATALOGS")
+                        catalogs = [row[0] for row in cursor.fetchall() if row[0] != "system"]
+                except Exception as e:
+                    print(f"[WARN] Crawler could not list catalogs on {server}: {e}")
+                    self._status["errors"].append(f"{server}: {e}")
+                    continue
+
+                for catalog in catalogs:
+                    if self._stop.is_set():
+                        return
+                    try:
+                        seen, refreshed = self.crawl_catalog(server, server_info, catalog)
+                        self._status["tables_seen"] += seen
+                        self._status["tables_refreshed"] += refreshed
+                    except Exception as e:
+                        print(f"[WARN] Crawler failed on {server}/{catalog}: {e}")
+                        self._status["errors"].append(f"{server}/{catalog}: {e}")
+        finally:
+            self._status["running"] = False
+            self._status["last_finished"] = datetime.now(timezone.utc).isoformat()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.crawl()
+            print(f"[INFO] Metadata index crawl finished in {round(time.monotonic() - started, 1)}s")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metadata-crawler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def trigger(self):
+        """Run a crawl now in the background unless one is already running."""
+        if self._status["running"]:
+            return False
+        threading.Thread(target=self.crawl, name="metadata-crawler-manual", daemon=True).start()
+        return True
+
+    def status(self):
+        with closing(self._connect()) as db:
+            table_count = db.execute("SELECT COUNT(*) FROM indexed_tables").fetchone()[0]
+            column_count = db.execute("SELECT COUNT(*) FROM indexed_columns").fetchone()[0]
+        return {**self._status, "indexed_tables": table_count, "indexed_columns": column_count}
+
+    # --- search ---
+
+    def search(self, query, server=None, kind="all", limit=50):
+        pattern = _fuzzy_pattern(query)
+        server_filter = " AND server = ?" if server else ""
+        params = [pattern] + ([server] if server else [])
+        rank_params = [query, _escape_like(query) + "%", "%" + _escape_like(query) + "%"]
+        results = []
+
+        with closing(self._connect()) as db:
+            if kind in ("all", "table"):
+                rows = db.execute(
+                    "SELECT server, catalog, schema_name, table_name, table_type, row_count, size_bytes, "
+                    "snapshot_id, last_modified FROM indexed_tables "
+                    f"WHERE table_name LIKE ? ESCAPE '\\'{server_filter} "
+                    f"ORDER BY {_rank_sql('table_name')} LIMIT {SEARCH_CANDIDATES}",
+                    params + rank_params
+                ).fetchall()
+                for row in rows:
+                    results.append({
+                        "kind": "table",
+                        "server": row[0],
+                        "catalog": row[1],
+                        "schema": row[2],
+                        "table": row[3],
+                        "tableType": row[4],
+                        "rows": row[5],
+                        "sizeBytes": row[6],
+                        "snapshotId": row[7],
+                        "lastModified": row[8],
+                        "score": _score(query, row[3]),
+                    })
+            if kind in ("all", "column"):
+                rows = db.execute(
+                    "SELECT server, catalog, schema_name, table_name, column_name, data_type FROM indexed_columns "
+                    f"WHERE column_name LIKE ? ESCAPE '\\'{server_filter} "
+                    f"ORDER BY {_rank_sql('column_name')} LIMIT {SEARCH_CANDIDATES}",
+                    params + rank_params
+                ).fetchall()
+                for row in rows:
+                    results.append({
+                        "kind": "column",
+                        "server": row[0],
+                        "catalog": row[1],
+                        "schema": row[2],
+                        "table": row[3],
+                        "column": row[4],
+                        "dataType": row[5],
+                        "score": _score(query, row[4]),
+                    })
+
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results[:limit]
+
+
+metadata_index = MetadataIndex()
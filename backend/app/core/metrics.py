@@ -0,0 +1,247 @@
+# In-process metrics rendered in the Prometheus text exposition format
+import threading
+import time
+
+from app.core.deadlines import QueryCancelled, apply_session_deadline, end_statement, start_statement
+from app.core.tracing import TRACE_SQL_MAX_LENGTH, finish_span, trace_span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, values in sorted(series.items()):
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics plus collectors that read gauges from other components at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """``collector()`` returns [(name, type, help, [(labels_dict, value), ...]), ...]."""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"[WARN] Metrics collector failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+http_request_errors = registry.counter(
+    "http_request_errors_total", "HTTP requests answered with a 5xx status or an unhandled error.", ("route", "status")
+)
+trino_statements_per_request = registry.histogram(
+    "trino_statements_per_request", "Trino statements issued while serving one HTTP request.", ("route",),
+    buckets=STATEMENT_COUNT_BUCKETS
+)
+trino_query_duration = registry.histogram(
+    "trino_query_duration_seconds", "Trino statement latency (submission until results are fetched).", ("server",)
+)
+trino_query_errors = registry.counter(
+    "trino_query_errors_total", "Trino statements that raised, by error class.", ("server", "error")
+)
+trino_query_cancellations = registry.counter(
+    "trino_query_cancellations_total", "Trino statements cancelled at their deadline or on client disconnect.",
+    ("server", "reason")
+)
+
+class InstrumentedCursor:
+    """Cursor proxy that times statements and traces them on the current request.
+
+    A statement is observed after fetchone()/fetchall() (or on the next
+    execute/close), so the latency covers fetching results rather than just
+    the submission. Every statement carries a deadline (see app.core.deadlines);
+    one that fails after being cancelled raises QueryCancelled.
+    """
+
+    def __init__(self, cursor, server, connection=None):
+        self._cursor = cursor
+        self._server = server
+        self._connection = connection
+        self._started = None
+        self._span = None
+        self._statement = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _finish(self, error=None):
+        """Observe the current statement; returns QueryCancelled if it had been cancelled."""
+        cancelled = None
+        if self._started is not None:
+            reason = end_statement(self._statement, error) if self._statement is not None else None
+            if reason is not None:
+                trino_query_cancellations.inc(server=self._server, reason=reason)
+                error = cancelled = QueryCancelled(reason, self._statement.timeout)
+            if error is None:
+                trino_query_duration.observe(time.monotonic() - self._started, server=self._server)
+            else:
+                trino_query_errors.inc(server=self._server, error=type(error).__name__)
+            finish_span(self._span, error=error, query_id=getattr(self._cursor, "query_id", None))
+            self._started, self._span, self._statement = None, None, None
+        return cancelled
+
+    def _failed(self, error):
+        cancelled = self._finish(error=error)
+        if cancelled is not None:
+            raise cancelled from error
+        raise error
+
+    def _fetch(self, method, *args):
+        try:
+            rows = getattr(self._cursor, method)(*args)
+        except Exception as e:
+            self._failed(e)
+        if self._span is not None:
+            self._span["rows"] += (1 if rows is not None else 0) if method == "fetchone" else len(rows)
+        return rows
+
+    def execute(self, operation, params=None):
+        self._finish()
+        self._statement = start_statement(self._cursor)
+        if self._connection is not None:
+            apply_session_deadline(self._connection.session, self._connection.base_properties, self._statement.timeout)
+        self._span = trace_span("sql", operation.strip()[:TRACE_SQL_MAX_LENGTH], server=self._server, rows=0)
+        self._started = time.monotonic()
+        try:
+            if params is None:
+                self._cursor.execute(operation)
+            else:
+                self._cursor.execute(operation, params)
+        except Exception as e:
+            self._failed(e)
+        return self
+
+    def fetchone(self):
+        row = self._fetch("fetchone")
+        self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._fetch("fetchmany") if size is None else self._fetch("fetchmany", size)
+        if not rows:
+            # An empty page means the result is exhausted
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch("fetchall")
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+class InstrumentedConnection:
+    def __init__(self, conn, server):
+        self._conn = conn
+        self._server = server
+        # trino.dbapi sends the client session's properties with every statement
+        self.session = getattr(conn, "_client_session", None)
+        self.base_properties = dict(self.session.properties) if self.session is not None else {}
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._server, self)
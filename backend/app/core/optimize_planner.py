@@ -0,0 +1,146 @@
+# Partition-targeted compaction planning from Iceberg $files statistics
+import os
+from datetime import date
+
+from app.core.iceberg_metadata import read_file_layout
+from app.core.sql import sql_literal
+
+SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB = int(os.getenv("SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB", 128))
+SMART_OPTIMIZE_BYTE_BUDGET_GB = float(os.getenv("SMART_OPTIMIZE_BYTE_BUDGET_GB", 100))
+SMART_OPTIMIZE_MIN_SMALL_FILES = int(os.getenv("SMART_OPTIMIZE_MIN_SMALL_FILES", 2))
+
+# A delete file costs a merge on every read, so it weighs more than a small data file
+DELETE_FILE_WEIGHT = 2.0
+
+
+def partition_predicate(partition, identity_columns):
+    """WHERE clause selecting one partition; returns (predicate, widened).
+
+    Identity fields become equality predicates and day-transform fields
+    (``<column>_day``) a one-day range on the source column. Other transform
+    fields (buckets, truncation, ...) cannot be filtered on and are left out,
+    which widens the predicate to a superset of the partition. The
+    predicate is None when no field can be used.
+    """
+    names = getattr(partition, "_names", None) or []
+    clauses, widened = [], False
+    for name, value in zip(names, partition):
+        if name in identity_columns:
+            literal = sql_literal(value)
+            clauses.append(f'"{name}" IS NULL' if literal is None else f'"{name}" = {literal}')
+        elif name.endswith("_day") and name[:-4] in identity_columns and isinstance(value, date):
+            column = name[:-4]
+            clauses.append(
+                f'"{column}" >= {sql_literal(value)} AND "{column}" < {sql_literal(value)} + INTERVAL \'1\' DAY'
+            )
+        else:
+            widened = True
+    return (" AND ".join(clauses) if clauses else None), widened
+
+
+def partition_label(partition):
+    names = getattr(partition, "_names", None) or []
+    if not names:
+        return str(partition)
+    return ", ".join(f"{name}={value}" for name, value in zip(names, partition))
+
+
+def read_partition_file_stats(cursor, catalog, schema, table, threshold_bytes):
+    """Per-partition file statistics; one row with partition None if unpartitioned."""
+    return [
+        {
+            "partition": layout["partition"],
+            "data_files": layout["data_files"],
+            "small_files": layout["small_files"],
+            "delete_files": layout["position_delete_files"] + layout["equality_delete_files"],
+            "total_bytes": layout["data_bytes"] + layout["delete_bytes"],
+        }
+        for layout in read_file_layout(cursor, catalog, schema, table, threshold_bytes)
+    ]
+
+
+def read_table_columns(cursor, catalog, schema, table):
+    cursor.execute(f'''
+        SELECT column_name
+        FROM "{catalog}".information_schema.columns
+        WHERE table_schema = {sql_literal(schema)} AND table_name = {sql_literal(table)}
+    ''')
+    return {row[0] for row in cursor.fetchall()}
+
+
+def plan_smart_optimize(cursor, catalog, schema, table,
+                        file_size_threshold_mb=SMART_OPTIMIZE_FILE_SIZE_THRESHOLD_MB,
+                        byte_budget_gb=SMART_OPTIMIZE_BYTE_BUDGET_GB,
+                        min_small_files=SMART_OPTIMIZE_MIN_SMALL_FILES):
+    """Score partitions and pick the worst ones that fit in the byte budget."""
+    threshold_bytes = file_size_threshold_mb * 1024 * 1024
+    budget_bytes = int(byte_budget_gb * 1024 ** 3)
+    partitions = read_partition_file_stats(cursor, catalog, schema, table, threshold_bytes)
+    identity_columns = read_table_columns(cursor, catalog, schema, table)
+
+    # Partitions sharing a predicate are rewritten by the same statement, so
+    # a widened predicate costs the bytes of every partition it matches
+    predicates, rewrite_bytes = [], {}
+    for stats in partitions:
+        predicate, widened = None, False
+        if stats["partition"] is not None:
+            predicate, widened = partition_predicate(stats["partition"], identity_columns)
+        predicates.append((predicate, widened))
+        rewrite_bytes[predicate] = rewrite_bytes.get(predicate, 0) + stats["total_bytes"]
+
+    candidates = []
+    for stats, (predicate, widened) in zip(partitions, predicates):
+        if stats["small_files"] < min_small_files and stats["delete_files"] == 0:
+            continue
+        score = stats["small_files"] + DELETE_FILE_WEIGHT * stats["delete_files"]
+        candidates.append({**stats, "score": score, "predicate": predicate, "predicate_widened": widened})
+    candidates.sort(key=lambda candidate: (candidate["score"], -candidate["total_bytes"]), reverse=True)
+
+    target = f'"{catalog}"."{schema}"."{table}"'
+    selected, skipped, planned_bytes = [], [], 0
+    decided = {}
+    for candidate in candidates:
+        predicate = candidate["predicate"]
+        entry = {
+            "partition": partition_label(candidate["partition"]) if candidate["partition"] is not None else None,
+            "data_files": candidate["data_files"],
+            "small_files": candidate["small_files"],
+            "delete_files": candidate["delete_files"],
+            "total_bytes": candidate["total_bytes"],
+            "rewrite_bytes": rewrite_bytes[predicate],
+            "score": candidate["score"],
+        }
+        if candidate["partition"] is not None and predicate is None:
+            skipped.append({**entry, "reason": "no identity partition field to filter on"})
+            continue
+        if predicate in decided:
+            # One statement per predicate, decided by its highest-scored partition
+            reason = "covered by a planned statement" if decided[predicate] else "over byte budget"
+            skipped.append({**entry, "reason": reason})
+            continue
+        decided[predicate] = planned_bytes + rewrite_bytes[predicate] <= budget_bytes
+        if not decided[predicate]:
+            skipped.append({**entry, "reason": "over byte budget"})
+            continue
+
+        planned_bytes += rewrite_bytes[predicate]
+        statement = f"ALTER TABLE {target} EXECUTE optimize(file_size_threshold => '{file_size_threshold_mb}MB')"
+        if predicate:
+            statement += f" WHERE {predicate}"
+        selected.append({
+            **entry, "predicate": predicate, "predicate_widened": candidate["predicate_widened"],
+            "statement": statement,
+        })
+
+    return {
+        "catalog": catalog,
+        "schema": schema,
+        "table": table,
+        "file_size_threshold_mb": file_size_threshold_mb,
+        "byte_budget_bytes": budget_bytes,
+        "partitions_total": len(partitions),
+        "partitions_needing_compaction": len(candidates),
+        "planned_bytes": planned_bytes,
+        "planned": selected,
+        "skipped": skipped,
+    }
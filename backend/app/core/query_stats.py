@@ -0,0 +1,251 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+from app.core.trino_client import TRINO_SERVERS, TRINO_SOURCE, pooled_connection
+
+# Polls system.runtime.queries on every server, so it is opt-in
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "false").lower() in ("1", "true", "yes")
+QUERY_STATS_INTERVAL = float(os.getenv("QUERY_STATS_INTERVAL", 15))
+QUERY_STATS_WINDOW = int(os.getenv("QUERY_STATS_WINDOW", 500))
+QUERY_STATS_MAX_TABLES = int(os.getenv("QUERY_STATS_MAX_TABLES", 5000))
+# Persistence is off unless a path is configured
+QUERY_STATS_PATH = os.getenv("QUERY_STATS_PATH", "")
+# Comma-separated query sources to ignore; defaults to this backend's own
+# source only, whose metadata reads would otherwise count as table usage
+QUERY_STATS_EXCLUDE_SOURCES = {
+    source.strip() for source in os.getenv("QUERY_STATS_EXCLUDE_SOURCES", TRINO_SOURCE).split(",") if source.strip()
+}
+
+SEEN_QUERY_IDS = 10000
+
+# Fully qualified catalog.schema.table after FROM/JOIN, optionally quoted
+_IDENTIFIER = r'(?:"(?:[^"]|"")+"|[A-Za-z_][\w]*)'
+_TABLE_REFERENCE = re.compile(
+    rf'\b(?:FROM|JOIN)\s+({_IDENTIFIER})\s*\.\s*({_IDENTIFIER})\s*\.\s*({_IDENTIFIER})',
+    re.IGNORECASE
+)
+
+
+def _unquote(identifier):
+    # Trino folds identifiers to lower case, quoted or not
+    if identifier.startswith('"'):
+        identifier = identifier[1:-1].replace('""', '"')
+    return identifier.lower()
+
+
+def referenced_tables(sql):
+    """Fully qualified (catalog, schema, table) references in a query.
+
+    Unqualified names depend on the session catalog/schema, which
+    system.runtime.queries does not record, so they are not attributed.
+    Iceberg metadata tables ($files, ...) are skipped: reading them says
+    nothing about how the table itself is queried.
+    """
+    tables = set()
+    for match in _TABLE_REFERENCE.finditer(sql):
+        catalog, schema, table = (_unquote(part) for part in match.groups())
+        if "$" in table or catalog == "system":
+            continue
+        tables.add((catalog, schema, table))
+    return tables
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class QueryStatsCollector:
+    """Per-table query latency and scan volume sampled from system.runtime.queries.
+
+    Every ``interval`` seconds each server's recently completed queries are
+    read (with scanned bytes summed from system.runtime.tasks) and
+    attributed to the tables they reference. Each table keeps a ring buffer
+    of its last ``window`` queries plus running totals.
+    """
+
+    def __init__(self, servers=TRINO_SERVERS, interval=QUERY_STATS_INTERVAL, window=QUERY_STATS_WINDOW,
+                 max_tables=QUERY_STATS_MAX_TABLES, path=QUERY_STATS_PATH):
+        self.servers = servers
+        self.interval = interval
+        self.window = window
+        self.max_tables = max_tables
+        self.path = path
+        self._lock = threading.Lock()
+        # (server, catalog, schema, table) -> {"samples": deque, "queries": int, "failed": int, "bytes": int}
+        self._tables = OrderedDict()
+        self._seen = {name: OrderedDict() for name in servers}
+        self._status = {name: {"last_sampled": None, "error": None} for name in servers}
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- sampling ---
+
+    def sample_server(self, name):
+        with pooled_connection(self.servers[name], "system", "runtime") as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT
+                    q.query_id,
+                    q.state,
+                    q.source,
+                    q.query,
+                    q.created,
+                    q."end",
+                    COALESCE(SUM(t.physical_input_bytes), 0) AS physical_input_bytes
+                FROM system.runtime.queries q
+                LEFT JOIN system.runtime.tasks t ON t.query_id = q.query_id
+                WHERE q.state IN ('FINISHED', 'FAILED') AND q."end" IS NOT NULL
+                GROUP BY q.query_id, q.state, q.source, q.query, q.created, q."end"
+            ''')
+            rows = cursor.fetchall()
+
+        seen = self._seen[name]
+        recorded = 0
+        for query_id, state, source, sql, created, ended, scanned_bytes in rows:
+            if query_id in seen:
+                continue
+            seen[query_id] = True
+            if source in QUERY_STATS_EXCLUDE_SOURCES:
+                continue
+            tables = referenced_tables(sql or "")
+            if not tables:
+                continue
+            elapsed_ms = round((ended - created).total_seconds() * 1000, 1)
+            sample = (ended.isoformat(), elapsed_ms, int(scanned_bytes or 0), state == "FAILED")
+            for table in tables:
+                self._record((name, *table), sample)
+            recorded += 1
+        while len(seen) > SEEN_QUERY_IDS:
+            seen.popitem(last=False)
+        return recorded
+
+    def _record(self, key, sample):
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is None:
+                entry = {"samples": deque(maxlen=self.window), "queries": 0, "failed": 0, "bytes": 0}
+                self._tables[key] = entry
+                while len(self._tables) > self.max_tables:
+                    self._tables.popitem(last=False)
+            self._tables.move_to_end(key)
+            entry["samples"].append(sample)
+            entry["queries"] += 1
+            entry["failed"] += 1 if sample[3] else 0
+            entry["bytes"] += sample[2]
+
+    def sample_all(self):
+        for name in self.servers:
+            try:
+                self.sample_server(name)
+                self._status[name] = {"last_sampled": datetime.now(timezone.utc).isoformat(), "error": None}
+            except Exception as e:
+                print(f"[WARN] Query stats sampling failed on {name}: {e}")
+                self._status[name] = {**self._status[name], "error": str(e)}
+
+    # --- persistence ---
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except Exception as e:
+            print(f"[WARN] Could not load query stats from {self.path}: {e}")
+            return
+        with self._lock:
+            for item in saved.get("tables", []):
+                self._tables[tuple(item["key"])] = {
+                    "samples": deque((tuple(sample) for sample in item["samples"]), maxlen=self.window),
+                    "queries": item["queries"],
+                    "failed": item["failed"],
+                    "bytes": item["bytes"],
+                }
+        print(f"[INFO] Loaded query stats for {len(saved.get('tables', []))} tables from {self.path}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            tables = [
+                {"key": list(key), "samples": list(entry["samples"]), "queries": entry["queries"],
+                 "failed": entry["failed"], "bytes": entry["bytes"]}
+                for key, entry in self._tables.items()
+            ]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"saved_at": datetime.now(timezone.utc).isoformat(), "tables": tables}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[WARN] Could not save query stats to {self.path}: {e}")
+
+    # --- lifecycle ---
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample_all()
+            self.save()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self.load()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="query-stats-collector", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.save()
+
+    # --- reporting ---
+
+    def _summarize(self, entry):
+        samples = list(entry["samples"])
+        latencies = sorted(sample[1] for sample in samples)
+        return {
+            "queries": entry["queries"],
+            "failed": entry["failed"],
+            "bytes_scanned": entry["bytes"],
+            "window": len(samples),
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "avg_bytes_scanned": round(sum(sample[2] for sample in samples) / len(samples)) if samples else None,
+            "last_query_at": samples[-1][0] if samples else None,
+        }
+
+    def table_stats(self, server, catalog, schema, table):
+        """Rolling stats for one table, or None if no queries were seen."""
+        with self._lock:
+            entry = self._tables.get((server, catalog.lower(), schema.lower(), table.lower()))
+            if entry is None:
+                return None
+            return self._summarize(entry)
+
+    def hottest_tables(self, server, limit=20, order_by="queries"):
+        with self._lock:
+            entries = [
+                {"catalog": key[1], "schema": key[2], "table": key[3], **self._summarize(entry)}
+                for key, entry in self._tables.items()
+                if key[0] == server
+            ]
+        entries.sort(key=lambda entry: entry[order_by] or 0, reverse=True)
+        return entries[:limit]
+
+    def status(self):
+        with self._lock:
+            tracked = len(self._tables)
+        return {"interval": self.interval, "window": self.window, "tables_tracked": tracked,
+                "persistence_path": self.path or None, "servers": dict(self._status)}
+
+
+query_stats = QueryStatsCollector()
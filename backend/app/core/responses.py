@@ -0,0 +1,76 @@
+# Fast JSON encoding and conditional GET (ETag / If-None-Match) for table-level routes and listings
+import hashlib
+import os
+from decimal import Decimal
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+# Responses smaller than this are sent uncompressed
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", 1000))
+# Clients may keep a copy but must revalidate it; for table routes a 304 costs one snapshot lookup
+REVALIDATE = "no-cache"
+
+
+def _default(value):
+    # Types orjson leaves to the caller, encoded the way FastAPI's jsonable_encoder would
+    if isinstance(value, tuple):
+        # trino row values (NamedRowTuple)
+        return list(value)
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, bytes):
+        return value.decode(errors="replace")
+    return str(value)
+
+
+def dumps(payload):
+    """Serialize to JSON bytes with orjson (datetimes as ISO 8601, non-str keys allowed)."""
+    return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def make_etag(body):
+    """Weak ETag over the encoded body, for responses not tied to a table snapshot."""
+    return f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def snapshot_etag(request: Request, snapshot_id, *live):
+    """Weak ETag for a table route at a snapshot, known before its payload is loaded.
+
+    Derived from the route, its query parameters and the snapshot id, plus
+    any ``live`` values merged into the response after the cached payload,
+    so revalidating costs one snapshot lookup however large the response.
+    None for tables without snapshots, whose responses are tagged by body digest.
+    """
+    if snapshot_id is None:
+        return None
+    key = [request.url.path, sorted(request.query_params.multi_items()), live]
+    return f'W/"{snapshot_id}-{hashlib.blake2b(dumps(key), digest_size=8).hexdigest()}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" match
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def not_modified(request: Request, etag):
+    """304 Not Modified when the client's copy carries ``etag``, else None."""
+    if etag is None or not etag_matches(request.headers.get("if-none-match"), etag):
+        return None
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+
+def conditional_json(request: Request, payload, etag=None):
+    """JSON response carrying an ETag (``etag``, or a digest of the body), or 304 when the client's copy is current."""
+    body = dumps(payload)
+    etag = etag or make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,113 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.cache import metadata_cache, table_tag
+from app.core.deadlines import CLIENT_DISCONNECT, QueryCancelled
+from app.core.trino_client import pooled_connection
+
+# Exact COUNT(*) runs are cancelled after this many seconds
+ROW_COUNT_EXACT_DEADLINE = float(os.getenv("ROW_COUNT_EXACT_DEADLINE", 120))
+ROW_COUNT_WORKERS = int(os.getenv("ROW_COUNT_WORKERS", 2))
+
+EXACT_COUNT_MODES = ("never", "background", "wait")
+
+
+class RowCounter:
+    """Exact row counts computed off the request path, under a deadline.
+
+    Requests answer with a connector estimate (SHOW STATS) straight away and
+    schedule the exact count here. Finished counts, and counts that hit the
+    deadline, are kept in the metadata cache ("row_counts" namespace, tagged
+    with the table) so later requests pick them up without rescanning.
+    """
+
+    def __init__(self, workers=ROW_COUNT_WORKERS, deadline=ROW_COUNT_EXACT_DEADLINE):
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="row-count")
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    def cached(self, server, catalog, schema, table):
+        """The stored result: {"rows": int or None, "status": "done" | "timed_out" | "failed"}, or None."""
+        hit, value = metadata_cache.get("row_counts", (server, catalog, schema, table))
+        return value if hit else None
+
+    def count(self, server, server_info, catalog, schema, table):
+        """Run COUNT(*) now, cancelling it at the deadline; stores and returns the result."""
+        key = (server, catalog, schema, table)
+        timed_out = threading.Event()
+        try:
+            with pooled_connection(server_info, catalog, schema) as conn:
+                cursor = conn.cursor()
+
+                def expire():
+                    timed_out.set()
+                    try:
+                        cursor.cancel()
+                    except Exception as e:
+                        print(f"[WARN] Failed to cancel row count for {catalog}.{schema}.{table}: {e}")
+
+                timer = threading.Timer(self.deadline, expire)
+                timer.daemon = True
+                timer.start()
+                try:
+                    cursor.execute(f'SELECT COUNT(*) FROM "{catalog}"."{schema}"."{table}"')
+                    result = {"rows": cursor.fetchone()[0], "status": "done"}
+                finally:
+                    timer.cancel()
+        except QueryCancelled as e:
+            if e.reason == CLIENT_DISCONNECT:
+                # Nothing learned about the table; the next request may count again
+                raise
+            print(f"[WARN] Exact row count for {catalog}.{schema}.{table} exceeded its deadline")
+            result = {"rows": None, "status": "timed_out"}
+        except Exception as e:
+            if timed_out.is_set():
+                print(f"[WARN] Exact row count for {catalog}.{schema}.{table} exceeded {self.deadline}s")
+                result = {"rows": None, "status": "timed_out"}
+            else:
+                print(f"[WARN] Exact row count failed for {catalog}.{schema}.{table}: {e}")
+                result = {"rows": None, "status": "failed"}
+        metadata_cache.set("row_counts", key, result, tags=[table_tag(*key)])
+        return result
+
+    def schedule(self, server, server_info, catalog, schema, table):
+        """Start a background exact count unless one is stored or already running."""
+        key = (server, catalog, schema, table)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+
+        def run():
+            try:
+                self.count(server, server_info, catalog, schema, table)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        self._executor.submit(run)
+
+    def resolve(self, server, server_info, catalog, schema, table, estimate, mode="never"):
+        """Best row count available now as (rows, approximate, exact_status)."""
+        stored = self.cached(server, catalog, schema, table)
+        if stored is not None:
+            if stored["status"] == "done":
+                return stored["rows"], False, "done"
+            return estimate, True, stored["status"]
+        if mode == "background":
+            self.schedule(server, server_info, catalog, schema, table)
+            return estimate, True, "pending"
+        return estimate, True, None
+
+    def status(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "deadline_seconds": self.deadline}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+row_counter = RowCounter()
@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+
+from app.core.deadlines import CLIENT_DISCONNECT, QueryScope, current_scope, use_scope
+from app.core.tracing import current_trace, start_trace
+
+
+class _Flight:
+    """One shared execution and the callers still waiting for it."""
+
+    def __init__(self, func):
+        # A fresh context with its own QueryScope and trace: the execution must
+        # not run under (and be cancelled with) whichever request started it
+        self.scope = QueryScope()
+        context = contextvars.Context()
+        context.run(use_scope, self.scope)
+        self.trace = context.run(start_trace)
+        self.task = context.run(asyncio.ensure_future, func())
+        self.waiters = set()
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one execution.
+
+    While a call for a key is in flight, later callers with the same key
+    await its result instead of starting their own. The shared execution
+    runs as its own task in its own context, so a caller that disconnects
+    does not cancel it for the others; its Trino statements are cancelled
+    only once every waiting caller has gone away.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self._calls = {}
+        self._executions = {}
+
+    async def do(self, endpoint, key, func):
+        """Return ``await func()``, shared with in-flight calls for (endpoint, key)."""
+        flight_key = (endpoint, key)
+        self._calls[endpoint] = self._calls.get(endpoint, 0) + 1
+
+        flight = self._in_flight.get(flight_key)
+        started = flight is None
+        if started:
+            self._executions[endpoint] = self._executions.get(endpoint, 0) + 1
+            flight = self._in_flight[flight_key] = _Flight(func)
+            flight.task.add_done_callback(lambda done: self._finish(flight_key, flight))
+
+        waiter = object()
+        flight.waiters.add(waiter)
+        scope = current_scope()
+        if scope is not None:
+            # The caller's client disconnected
+            scope.on_cancel(lambda reason: self._leave(flight_key, flight, waiter, reason))
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            trace = current_trace()
+            if started and trace is not None:
+                # The statements show up in Server-Timing of the request that caused them
+                trace.merge(flight.trace)
+            self._leave(flight_key, flight, waiter)
+
+    def _leave(self, flight_key, flight, waiter, reason=CLIENT_DISCONNECT):
+        flight.waiters.discard(waiter)
+        if flight.waiters or flight.task.done():
+            return
+        # Nobody is left to receive the result
+        if self._in_flight.get(flight_key) is flight:
+            del self._in_flight[flight_key]
+        flight.scope.cancel_all(reason)
+
+    def _finish(self, flight_key, flight):
+        if self._in_flight.get(flight_key) is flight:
+            del self._in_flight[flight_key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            flight.task.exception()
+
+    def stats(self):
+        endpoints = {}
+        for endpoint, calls in self._calls.items():
+            executions = self._executions.get(endpoint, 0)
+            endpoints[endpoint] = {
+                "calls": calls,
+                "executions": executions,
+                "deduplicated": calls - executions,
+            }
+        return {"in_flight": len(self._in_flight), "endpoints": endpoints}
+
+
+single_flight = SingleFlight()
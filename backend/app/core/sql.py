@@ -0,0 +1,18 @@
+# Literals for SQL built as text (Trino statements carry no bind parameters here)
+from datetime import date, datetime
+from decimal import Decimal
+
+
+def sql_literal(value):
+    """Trino literal for a Python value; strings are quoted with embedded quotes doubled."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        return f"TIMESTAMP '{value.isoformat(sep=' ')}'"
+    if isinstance(value, date):
+        return f"DATE '{value.isoformat()}'"
+    return "'" + str(value).replace("'", "''") + "'"
@@ -0,0 +1,109 @@
+# Keyset pagination cursors and NDJSON streaming for large listings
+import asyncio
+import base64
+import json
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from fastapi.responses import StreamingResponse
+
+from app.core.executor import run_trino
+from app.core.responses import dumps
+
+NDJSON_BATCH_SIZE = int(os.getenv("NDJSON_BATCH_SIZE", 500))
+# Rows buffered between the Trino worker thread and the client
+NDJSON_QUEUE_SIZE = int(os.getenv("NDJSON_QUEUE_SIZE", 1000))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+RESPONSE_FORMATS = ("json", "ndjson")
+
+_END = object()
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    """Opaque page token for a keyset position (a JSON-serializable dict)."""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        position = json.loads(raw)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid pagination cursor: {e}")
+    if not isinstance(position, dict):
+        raise InvalidCursor("Invalid pagination cursor")
+    return position
+
+
+def iter_rows(cursor, batch_size=NDJSON_BATCH_SIZE):
+    """Yield a cursor's rows in fetchmany() batches instead of one fetchall()."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def ndjson_response(server, produce, heavy=False):
+    """Stream the items of ``produce()`` (a blocking generator) as NDJSON.
+
+    The generator runs on the server's Trino executor lane and hands items
+    over through a bounded queue, so a slow client pauses the Trino fetch
+    instead of buffering the listing in memory. If the client disconnects
+    the generator is closed, which lets it cancel its query. An error after
+    the first line is reported as a final ``{"error": ...}`` line.
+    """
+    async def lines():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=NDJSON_QUEUE_SIZE)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+                try:
+                    future.result(timeout=0.5)
+                    return True
+                except FutureTimeout:
+                    if not future.cancel():
+                        # The put completed just after the timeout
+                        return True
+            return False
+
+        def pump():
+            items = produce()
+            try:
+                for item in items:
+                    if not put(item):
+                        break
+            except Exception as e:
+                print(f"[WARN] NDJSON stream failed: {e}")
+                put({"error": str(e)})
+            finally:
+                items.close()
+                put(_END)
+
+        task = asyncio.ensure_future(run_trino(server, pump, heavy=heavy))
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    # The worker never started (e.g. the lane was saturated)
+                    getter.cancel()
+                    yield dumps({"error": str(task.exception())}) + b"\n"
+                    break
+                item = getter.result()
+                if item is _END:
+                    break
+                yield dumps(item) + b"\n"
+        finally:
+            stop.set()
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE, headers={"X-Accel-Buffering": "no"})
@@ -0,0 +1,119 @@
+# Per-request trace of Trino statements and probes, for Server-Timing and ?trace=1
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+# Allow the JSON trace block to be requested and name statements by their SQL
+# in Server-Timing; both expose query text to clients
+REQUEST_TRACE_DEBUG_ENABLED = os.getenv("REQUEST_TRACE_DEBUG_ENABLED", "false").lower() in ("1", "true", "yes")
+# Individual entries listed in the Server-Timing header; the rest are only summed
+SERVER_TIMING_MAX_ENTRIES = int(os.getenv("SERVER_TIMING_MAX_ENTRIES", 20))
+TRACE_SQL_MAX_LENGTH = 2000
+
+_current_trace = ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Spans recorded while serving one HTTP request.
+
+    Worker threads run in a copy of the request context, so they append to
+    the same trace object.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def start(self, kind, name, **details):
+        now = time.monotonic()
+        span = {"kind": kind, "name": name, "offset_ms": round((now - self.started) * 1000, 1),
+                "duration_ms": None, "error": None, **details, "_started": now}
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @staticmethod
+    def finish(span, error=None, **details):
+        started = span.pop("_started", None)
+        if started is not None and span["duration_ms"] is None:
+            span["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"
+        span.update(details)
+
+    def merge(self, other):
+        """Add the spans of ``other``, e.g. a shared execution started for this request."""
+        shift = (other.started - self.started) * 1000
+        with other._lock:
+            spans = [{**span, "offset_ms": round(span["offset_ms"] + shift, 1)} for span in other.spans]
+        with self._lock:
+            self.spans.extend(spans)
+
+    def statement_count(self):
+        with self._lock:
+            return sum(1 for span in self.spans if span["kind"] == "sql")
+
+    def server_timing(self, total_ms, include_sql=False):
+        """Server-Timing header value: totals first, then the slowest spans.
+
+        Statements are described by their SQL only with ``include_sql``.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        statements = [span for span in spans if span["kind"] == "sql"]
+        sql_ms = sum(span["duration_ms"] or 0 for span in statements)
+        entries = [
+            f'total;dur={round(total_ms, 1)}',
+            f'trino;dur={round(sql_ms, 1)};desc="{len(statements)} statements"',
+        ]
+        slowest = sorted(spans, key=lambda span: span["duration_ms"] or 0, reverse=True)
+        for index, span in enumerate(slowest[:SERVER_TIMING_MAX_ENTRIES]):
+            desc = _header_safe(span["name"]) if span["kind"] != "sql" or include_sql else "statement"
+            if span["error"]:
+                desc = f"ERROR {desc}"
+            entry = f'{span["kind"]}-{index + 1};desc="{desc}"'
+            if span["duration_ms"] is not None:
+                entry += f';dur={span["duration_ms"]}'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def as_dict(self, total_ms):
+        with self._lock:
+            spans = [{key: value for key, value in span.items() if not key.startswith("_")} for span in self.spans]
+        return {
+            "total_ms": round(total_ms, 1),
+            "statement_count": sum(1 for span in spans if span["kind"] == "sql"),
+            "spans": spans,
+        }
+
+
+def _header_safe(text, limit=60):
+    text = " ".join(str(text).split())
+    if len(text) > limit:
+        text = text[:limit - 3] + "..."
+    return text.replace("\\", "").replace('"', "'").encode("ascii", "replace").decode("ascii")
+
+
+def start_trace():
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def trace_span(kind, name, **details):
+    """Open a span on the current request's trace (None outside a request)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    return trace.start(kind, name, **details)
+
+
+def finish_span(span, error=None, **details):
+    if span is not None:
+        RequestTrace.finish(span, error=error, **details)
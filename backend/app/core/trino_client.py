@@ -1,4 +1,18 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from requests.exceptions import RequestException
 from trino.dbapi import connect
+from trino.exceptions import HttpError, OperationalError, TrinoQueryError, TrinoUserError
+
+from app.core.deadlines import DEADLINE, QueryCancelled, current_scope
+from app.core.iceberg_metadata import read_stats_row_count
+from app.core.metrics import InstrumentedConnection
+from app.core.tracing import finish_span, trace_span
 
 # No need to import unused modules
 TRINO_SERVERS = {
@@ -9,6 +23,25 @@ TRINO_SERVERS = {
     }
 }
 
+# Client source on every statement this backend sends (shown in system.runtime.queries);
+# its own name, so other trino-python-client workloads stay distinguishable
+TRINO_SOURCE = os.getenv("TRINO_SOURCE", "trino-iceberg-navigator")
+
+# Connection pool tuning (per Trino server, i.e. per host:port)
+POOL_MAX_PER_SERVER = int(os.getenv("TRINO_POOL_MAX_PER_SERVER", 16))
+POOL_IDLE_TIMEOUT = float(os.getenv("TRINO_POOL_IDLE_TIMEOUT", 300))
+POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("TRINO_POOL_HEALTH_CHECK_INTERVAL", 60))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("TRINO_POOL_ACQUIRE_TIMEOUT", 30))
+
+# Concurrent metadata probes (see run_probes)
+PROBE_WORKERS = int(os.getenv("TRINO_PROBE_WORKERS", 16))
+PROBE_TIMEOUT = float(os.getenv("TRINO_PROBE_TIMEOUT", 20))
+
+
+class TrinoPoolTimeout(Exception):
+    pass
+
+
 def get_available_trino_servers():
     return [
         {
@@ -19,14 +52,308 @@ def get_available_trino_servers():
         }
     ]
 
+def server_label(host, port):
+    """Configured server name for host:port, used to label metrics."""
+    for name, server in TRINO_SERVERS.items():
+        if server["host"] == host and server["port"] == port:
+            return name
+    return f"{host}:{port}"
+
+
 def get_trino_connection(host: str, port: int, user: str, catalog: str, schema: str):
-    return connect(
+    conn = connect(
         host=host,
         port=port,
         user=user,
         catalog=catalog,
-        schema=schema
+        schema=schema,
+        source=TRINO_SOURCE
     )
+    return InstrumentedConnection(conn, server_label(host, port))
+
+
+def _is_connection_failure(exc):
+    # Query errors (bad SQL, missing table, ...) leave the HTTP session usable
+    if isinstance(exc, TrinoQueryError):
+        return False
+    return isinstance(exc, (OperationalError, HttpError, RequestException))
+
+
+class TrinoConnectionPool:
+    """Reusable Trino connections keyed by (host, port, user, catalog, schema).
+
+    Each server (host, port) may have at most ``max_per_server`` open
+    connections, idle or in use. Idle connections are closed after
+    ``idle_timeout`` seconds and re-validated with ``SELECT 1`` when they have
+    been idle longer than ``health_check_interval``.
+    """
+
+    def __init__(self, max_per_server=POOL_MAX_PER_SERVER, idle_timeout=POOL_IDLE_TIMEOUT,
+                 health_check_interval=POOL_HEALTH_CHECK_INTERVAL, acquire_timeout=POOL_ACQUIRE_TIMEOUT,
+                 connection_factory=get_trino_connection):
+        self.max_per_server = max_per_server
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._connection_factory = connection_factory
+        self._cond = threading.Condition()
+        self._idle = {}      # key -> [(conn, last_used)], most recently used last
+        self._open = {}      # (host, port) -> open connection count
+        self._in_use = {}    # (host, port) -> checked-out connection count
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+
+    @staticmethod
+    def _key(server_info, catalog, schema):
+        return (server_info["host"], server_info["port"], server_info["user"], catalog, schema)
+
+    def _close(self, server_key, conn):
+        # Caller holds the lock
+        self._open[server_key] -= 1
+        self._discarded += 1
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"[WARN] Failed to close Trino connection: {e}")
+
+    def _evict_expired(self, now):
+        for key in list(self._idle):
+            entries = self._idle[key]
+            keep = []
+            for conn, last_used in entries:
+                if now - last_used > self.idle_timeout:
+                    self._close(key[:2], conn)
+                else:
+                    keep.append((conn, last_used))
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+
+    def _evict_oldest(self, server_key):
+        # Free a slot held by an idle connection for another catalog/schema
+        oldest = None
+        for key, entries in self._idle.items():
+            if key[:2] == server_key and entries:
+                if oldest is None or entries[0][1] < self._idle[oldest][0][1]:
+                    oldest = key
+        if oldest is None:
+            return False
+        conn, _ = self._idle[oldest].pop(0)
+        if not self._idle[oldest]:
+            del self._idle[oldest]
+        self._close(server_key, conn)
+        return True
+
+    def _healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            return True
+        except Exception as e:
+            print(f"[WARN] Pooled Trino connection failed health check: {e}")
+            return False
+
+    def acquire(self, server_info, catalog, schema):
+        key = self._key(server_info, catalog, schema)
+        server_key = key[:2]
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            conn, last_used = None, None
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    self._evict_expired(now)
+                    entries = self._idle.get(key)
+                    if entries:
+                        conn, last_used = entries.pop()
+                        if not entries:
+                            del self._idle[key]
+                        break
+                    if self._open.get(server_key, 0) < self.max_per_server:
+                        self._open[server_key] = self._open.get(server_key, 0) + 1
+                        break
+                    if self._evict_oldest(server_key):
+                        continue
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TrinoPoolTimeout(
+                            f"No Trino connection available for {server_key[0]}:{server_key[1]} "
+                            f"within {self.acquire_timeout}s"
+                        )
+                    self._cond.wait(remaining)
+                self._in_use[server_key] = self._in_use.get(server_key, 0) + 1
+
+            if conn is None:
+                try:
+                    conn = self._connection_factory(
+                        host=key[0], port=key[1], user=key[2], catalog=catalog, schema=schema
+                    )
+                except Exception:
+                    with self._cond:
+                        self._open[server_key] -= 1
+                        self._in_use[server_key] -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+                return key, conn
+
+            if time.monotonic() - last_used < self.health_check_interval or self._healthy(conn):
+                with self._cond:
+                    self._reused += 1
+                return key, conn
+
+            with self._cond:
+                self._in_use[server_key] -= 1
+                self._close(server_key, conn)
+                self._cond.notify()
+
+    def release(self, key, conn, discard=False):
+        server_key = key[:2]
+        with self._cond:
+            self._in_use[server_key] -= 1
+            if discard:
+                self._close(server_key, conn)
+            else:
+                self._idle.setdefault(key, []).append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, server_info, catalog, schema):
+        key, conn = self.acquire(server_info, catalog, schema)
+        try:
+            yield conn
+        except BaseException as e:
+            self.release(key, conn, discard=_is_connection_failure(e))
+            raise
+        else:
+            self.release(key, conn)
+
+    def stats(self):
+        with self._cond:
+            servers = {}
+            for server_key, open_count in self._open.items():
+                servers[f"{server_key[0]}:{server_key[1]}"] = {
+                    "open": open_count,
+                    "in_use": self._in_use.get(server_key, 0),
+                    "max": self.max_per_server,
+                }
+            return {
+                "servers": servers,
+                "created": self._created,
+                "reused": self._reused,
+                "discarded": self._discarded,
+            }
+
+    def close_all(self):
+        with self._cond:
+            for key, entries in self._idle.items():
+                for conn, _ in entries:
+                    self._close(key[:2], conn)
+            self._idle.clear()
+            self._cond.notify_all()
+
+
+connection_pool = TrinoConnectionPool()
+
+
+def pooled_connection(server_info: dict, catalog: str, schema: str):
+    """Context manager yielding a pooled connection for one of ``TRINO_SERVERS``."""
+    return connection_pool.connection(server_info, catalog, schema)
+
+
+_probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="trino-probe")
+
+
+def run_probes(server_info: dict, catalog: str, schema: str, probes: dict, timeout: float = PROBE_TIMEOUT):
+    """Run independent ``probe(cursor)`` callables concurrently.
+
+    Each probe gets its own pooled connection. A probe failing with a Trino
+    user error (e.g. a metadata table the connector does not have) yields
+    None. Probes still running when ``timeout`` expires have their Trino
+    query cancelled and raise QueryCancelled; other failures are re-raised
+    once every probe has settled, so partial results are never returned.
+    """
+    cursors = {}
+    spans = {}
+
+    def run(name, probe):
+        span = spans[name] = trace_span("probe", name)
+        try:
+            with pooled_connection(server_info, catalog, schema) as conn:
+                cursor = conn.cursor()
+                cursors[name] = cursor
+                result = probe(cursor)
+        except Exception as e:
+            finish_span(span, error=e)
+            raise
+        finish_span(span)
+        return result
+
+    # Each probe runs in a copy of the caller's context so per-request
+    # instrumentation follows it onto the probe threads
+    futures = {
+        name: _probe_executor.submit(contextvars.copy_context().run, run, name, probe)
+        for name, probe in probes.items()
+    }
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    results = {}
+    error = late = None
+    for name, future in futures.items():
+        results[name] = None
+        if future in done:
+            try:
+                results[name] = future.result()
+            except TrinoUserError as e:
+                print(f"[WARN] Probe {name} failed for {catalog}.{schema}: {e}")
+            except Exception as e:
+                print(f"[WARN] Probe {name} failed for {catalog}.{schema}: {e}")
+                error = error or e
+            continue
+
+        print(f"[WARN] Probe {name} exceeded {timeout}s for {catalog}.{schema}, cancelling")
+        finish_span(spans.get(name), error=TimeoutError(f"exceeded {timeout}s, cancelled"))
+        future.cancel()
+        cursor = cursors.get(name)
+        if cursor is not None:
+            try:
+                cursor.cancel()
+            except Exception as e:
+                print(f"[WARN] Failed to cancel probe {name}: {e}")
+        late = late or QueryCancelled(DEADLINE, timeout)
+    if late is not None and current_scope() is not None:
+        current_scope().record(DEADLINE)
+    if error or late:
+        raise error or late
+    return results
+
+
+def query_progress(cursor):
+    """Progress of the cursor's running query from the client's latest stats."""
+    try:
+        stats = cursor.stats or {}
+        query_id = cursor.query_id
+    except Exception:
+        # execute() has not submitted the query yet
+        stats, query_id = {}, None
+    total_splits = stats.get("totalSplits")
+    completed_splits = stats.get("completedSplits")
+    return {
+        "query_id": query_id,
+        "state": stats.get("state"),
+        "elapsed_ms": stats.get("elapsedTimeMillis", stats.get("wallTimeMillis")),
+        "completed_splits": completed_splits,
+        "total_splits": total_splits,
+        "percent": round(100 * completed_splits / total_splits, 1) if total_splits else None,
+        "processed_rows": stats.get("processedRows"),
+        "processed_bytes": stats.get("processedBytes"),
+    }
+
 
 def fetch_catalogs(server_name: str):
     print("📍 Fetching catalogs for:", server_name)  # Debug
@@ -36,17 +363,10 @@ def fetch_catalogs(server_name: str):
         raise ValueError("Trino server not found")
 
     try:
-        conn = get_trino_connection(
-            host=server["host"],
-            port=server["port"],
-            user=server["user"],
-            catalog="system",
-            schema="information_schema"
-        )
-
-        cursor = conn.cursor()
-        cursor.execute("SHOW CATALOGS")
-        result = cursor.fetchall()
+        with pooled_connection(server, "system", "information_schema") as conn:
+            cursor = conn.cursor()
+            cursor.execute("SHOW CATALOGS")
+            result = cursor.fetchall()
         print("✅ Catalogs fetched:", result)
         return [row[0] for row in result]
     except Exception as e:
@@ -54,39 +374,32 @@ def fetch_catalogs(server_name: str):
         raise
 
 def get_table_metadata(host: str, port: int, user: str, catalog: str, schema: str, table: str):
-    conn = get_trino_connection(host, port, user, catalog, schema)
-    cursor = conn.cursor()
+    server = {"host": host, "port": port, "user": user}
+    with pooled_connection(server, catalog, schema) as conn:
+        cursor = conn.cursor()
 
-    # Total row count
-    try:
-        query = f'''
-            SELECT 
-                COUNT(*) as total_rows 
-            FROM "{catalog}"."{schema}"."{table}"
-        '''
-        cursor.execute(query)
-        total_rows = cursor.fetchone()[0]
-    except Exception as e:
-        total_rows = None
+        # Connector estimate; an exact COUNT(*) scans the whole table
+        total_rows = read_stats_row_count(cursor, catalog, schema, table)
 
-    # Snapshot info (only available for Iceberg tables)
-    try:
-        query = f'''
-            SELECT 
-                COUNT(*) as snapshot_count,
-                MAX(committed_at) as latest_snapshot_at
-            FROM "{catalog}"."{schema}"."{table}$snapshots"
-        '''
-        cursor.execute(query)
-        result = cursor.fetchone()
-        snapshot_count = result[0]
-        latest_snapshot = result[1]
-    except Exception as e:
-        snapshot_count = None
-        latest_snapshot = None
+        # Snapshot info (only available for Iceberg tables)
+        try:
+            query = f'''
+                SELECT
+                    COUNT(*) as snapshot_count,
+                    MAX(committed_at) as latest_snapshot_at
+                FROM "{catalog}"."{schema}"."{table}$snapshots"
+            '''
+            cursor.execute(query)
+            result = cursor.fetchone()
+            snapshot_count = result[0]
+            latest_snapshot = result[1]
+        except Exception as e:
+            snapshot_count = None
+            latest_snapshot = None
 
     return {
         "total_rows": total_rows,
+        "total_rows_approximate": True,
         "snapshot_count": snapshot_count,
         "latest_snapshot": str(latest_snapshot) if latest_snapshot else None
     }
@@ -0,0 +1,281 @@
+# In-process stand-in for Trino: a DB-API connection over a synthetic warehouse
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from trino.exceptions import TrinoUserError
+from trino.types import NamedRowTuple
+
+# "catalog"."schema"."table$suffix" or catalog.schema.table (DDL uses the latter)
+TABLE_REFERENCE = re.compile(r'"?([\w-]+)"?\."?([\w-]+)"?\."?([\w-]+)(\$\w+)?"?')
+EPOCH = datetime(2024, 1, 1)
+
+
+def _stable(*parts):
+    # Deterministic per-object numbers, independent of PYTHONHASHSEED
+    return zlib.crc32("/".join(str(part) for part in parts).encode())
+
+
+class SyntheticWarehouse:
+    """Catalogs, schemas and Iceberg tables with deterministic statistics."""
+
+    def __init__(self, catalogs=3, schemas_per_catalog=100, tables_per_schema=50, partitions_per_table=8,
+                 snapshots_per_table=20):
+        self.catalogs = [f"iceberg_{index}" for index in range(catalogs)]
+        self.schemas = [f"schema_{index:04d}" for index in range(schemas_per_catalog)]
+        self.tables = [f"table_{index:05d}" for index in range(tables_per_schema)]
+        self.partitions_per_table = partitions_per_table
+        self.snapshots_per_table = snapshots_per_table
+        self._catalog_set, self._schema_set, self._table_set = set(self.catalogs), set(self.schemas), set(self.tables)
+
+    @property
+    def table_count(self):
+        return len(self.catalogs) * len(self.schemas) * len(self.tables)
+
+    def has_table(self, catalog, schema, table):
+        return catalog in self._catalog_set and schema in self._schema_set and table in self._table_set
+
+    def table_stats(self, catalog, schema, table):
+        seed = _stable(catalog, schema, table)
+        files = 10 + seed % 990
+        return {
+            "files": files,
+            "rows": files * (1000 + seed % 50000),
+            "bytes": files * (1 + seed % 256) * 1024 * 1024,
+            "snapshot_id": seed,
+            "manifests": 1 + seed % 200,
+        }
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+        self.query_id = None
+        self.stats = {}
+
+    def execute(self, operation, params=None):
+        connection = self.connection
+        connection.backend.statement(operation)
+        self.query_id = f"bench_{next(connection.backend.query_ids)}"
+        self.rows = connection.backend.answer(" ".join(operation.split()), connection.catalog, connection.schema)
+        return self
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, backend, catalog, schema):
+        self.backend = backend
+        self.catalog = catalog
+        self.schema = schema
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+class FakeTrino:
+    """Answers the SQL this backend issues, after a configurable simulated latency.
+
+    Every statement sleeps ``latency_ms`` plus up to ``jitter_ms`` (uniform),
+    so concurrency limits and pool sizes behave as they would against a
+    remote coordinator.
+    """
+
+    def __init__(self, warehouse, latency_ms=20, jitter_ms=10, seed=0):
+        self.warehouse = warehouse
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.query_ids = iter(range(1, 1 << 62))
+        self.statements = 0
+        self.unknown = {}
+
+    def connect(self, host, port, user, catalog, schema, source=None):
+        return FakeConnection(self, catalog, schema)
+
+    def statement(self, sql):
+        with self._lock:
+            self.statements += 1
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+        time.sleep(delay / 1000)
+
+    # --- SQL shapes ---
+
+    def _table(self, q):
+        match = TABLE_REFERENCE.search(q)
+        if match is None:
+            return None, None, None, None
+        catalog, schema, table, suffix = match.groups()
+        if not self.warehouse.has_table(catalog, schema, table):
+            raise TrinoUserError(
+                {"errorName": "TABLE_NOT_FOUND", "errorType": "USER_ERROR",
+                 "message": f"Table '{catalog}.{schema}.{table}' does not exist"}
+            )
+        return catalog, schema, table, suffix
+
+    def answer(self, q, session_catalog, session_schema):
+        warehouse = self.warehouse
+        if q == "SELECT 1":
+            return [(1,)]
+        if q == "SHOW CATALOGS":
+            return [(catalog,) for catalog in warehouse.catalogs] + [("system",)]
+        if "system.metadata.catalogs" in q:
+            return [(catalog, len(warehouse.schemas), len(warehouse.schemas) * len(warehouse.tables))
+                    for catalog in warehouse.catalogs]
+        if "system.runtime.queries" in q:
+            return []
+        if q == "SHOW TABLES":
+            return [(table,) for table in warehouse.tables]
+        if "information_schema.schemata s" in q:
+            total = len(warehouse.schemas)
+            after = re.search(r"schema_name > '([\w-]+)'", q)
+            schemas = [schema for schema in warehouse.schemas if after is None or schema > after.group(1)]
+            return [(schema, len(warehouse.tables), total) for schema in self._page(q, schemas)]
+        if "information_schema.schemata" in q and "COUNT(*)" in q:
+            return [(len(warehouse.schemas),)]
+        if "information_schema.tables" in q:
+            if q.startswith("SELECT 1 "):
+                table_catalog = re.search(r'"([\w-]+)"\.information_schema', q).group(1)
+                table_schema, table_name = re.findall(r"'([\w-]+)'", q)[:2]
+                return [(1,)] if warehouse.has_table(table_catalog, table_schema, table_name) else []
+            if "COUNT(*)" in q:
+                return [(len(warehouse.schemas) * len(warehouse.tables),)]
+            if q.startswith("SELECT table_name"):
+                after = re.search(r"table_name > '([\w-]+)'", q)
+                tables = [table for table in warehouse.tables if after is None or table > after.group(1)]
+                return [(table,) for table in self._page(q, tables)]
+            schemas = re.findall(r"'([\w-]+)'", q.split("WHERE", 1)[1]) if "WHERE" in q else warehouse.schemas
+            if "table_type" in q:
+                return [(schema, table, "BASE TABLE") for schema in schemas for table in warehouse.tables]
+            return [(schema, table) for schema in schemas for table in warehouse.tables]
+        if "information_schema.columns" in q:
+            return [(name,) for name in ("id", "region", "amount", "ts")]
+        if "SUM(size_bytes) FROM (" in q:
+            return [(sum(warehouse.table_stats(ref[0], ref[1], ref[2])["bytes"]
+                         for ref in TABLE_REFERENCE.findall(q)),)]
+
+        catalog, schema, table, suffix = self._table(q)
+        if catalog is None:
+            self.unknown[q[:80]] = self.unknown.get(q[:80], 0) + 1
+            return []
+        stats = warehouse.table_stats(catalog, schema, table)
+        committed = EPOCH + timedelta(hours=stats["snapshot_id"] % 5000)
+
+        if q.startswith("SHOW STATS"):
+            return [("id", None, 100.0, 0.0, None, "1", "999"), (None, None, None, None, float(stats["rows"]), None, None)]
+        if q.startswith("SHOW CREATE TABLE"):
+            return [(f'CREATE TABLE {catalog}.{schema}.{table} (id bigint, region varchar, amount double, ts timestamp(6))\n'
+                     f"WITH (format = 'PARQUET', partitioning = ARRAY['region'])",)]
+        if suffix is None and "COUNT(*)" in q:
+            return [(stats["rows"],)]
+        if suffix == "$properties":
+            return [("write.format.default", "PARQUET")]
+        if suffix == "$manifests":
+            return self._manifests(q, stats)
+        if q.startswith("ALTER TABLE") and "EXECUTE" in q:
+            return [(True,)]
+        if suffix == "$snapshots" and "date_trunc" in q:
+            return self._timeline(q, stats, committed)
+        if "CROSS JOIN" in q:
+            return [(stats["rows"], stats["bytes"], self.warehouse.snapshots_per_table, committed)]
+        if suffix == "$files" and "GROUP BY partition" in q:
+            return self._partitions(stats, detailed="file_size_in_bytes >=" in q)
+        if suffix == "$files":
+            return [(stats["files"], stats["rows"], stats["bytes"], stats["bytes"] / stats["files"])]
+        if suffix == "$snapshots" and "OVER ()" in q:
+            count = self.warehouse.snapshots_per_table
+            return [(stats["snapshot_id"] - index, committed - timedelta(hours=index), "append",
+                     {"added-records": "1000"}, count, committed - timedelta(days=3), 1)
+                    for index in range(min(count, 50))]
+        if suffix == "$snapshots" and "snapshot_id DESC" in q:
+            before = re.search(r"snapshot_id < (\d+)", q)
+            ids = range(stats["snapshot_id"], stats["snapshot_id"] - self.warehouse.snapshots_per_table, -1)
+            rows = [(snapshot_id, committed - timedelta(hours=stats["snapshot_id"] - snapshot_id), "append",
+                     {"added-records": "1000"}) for snapshot_id in ids]
+            return self._page(q, [row for row in rows if before is None or row[0] < int(before.group(1))])
+        if suffix == "$snapshots" and "operation = 'replace'" in q:
+            return [(committed - timedelta(days=3), 1)]
+        if suffix == "$snapshots":
+            return [(stats["snapshot_id"],)]
+        self.unknown[q[:80]] = self.unknown.get(q[:80], 0) + 1
+        return []
+
+    @staticmethod
+    def _page(q, items):
+        offset = re.search(r"OFFSET (\d+)", q)
+        limit = re.search(r"LIMIT (\d+)", q)
+        items = items[int(offset.group(1)):] if offset else items
+        return items[:int(limit.group(1))] if limit else items
+
+    def _manifests(self, q, stats):
+        count = stats["manifests"]
+        files = max(1, stats["files"] // count)
+        if "COUNT(*)" in q:
+            small = count if files < 50 else 0
+            return [(count, count * 64 * 1024, 16 * 1024, 512 * 1024, 64 * 1024, small,
+                     count * files // 4, count * files - count * files // 4, 0, count // 4, 0.25, 1)]
+        rows = [(f"s3://warehouse/metadata/manifest-{index}.avro", 64 * 1024, 0, stats["snapshot_id"] - index,
+                 files // 4, files - files // 4, 0) for index in range(count)]
+        return self._page(q, rows)
+
+    def _timeline(self, q, stats, committed):
+        # One append per hour, newest at ``committed``
+        count = self.warehouse.snapshots_per_table
+        snapshots = [(stats["snapshot_id"] - age, committed - timedelta(hours=age)) for age in range(count)][::-1]
+        since = re.search(r"WHERE snapshot_id = (\d+)", q)
+        found = None
+        if since is not None:
+            found = next((at for snapshot_id, at in snapshots if snapshot_id == int(since.group(1))), None)
+            if found is not None:
+                snapshots = [(snapshot_id, at) for snapshot_id, at in snapshots if at > found]
+        hourly = "date_trunc('hour'" in q
+        buckets = {}
+        for snapshot_id, at in snapshots:
+            bucket = at.replace(minute=0, second=0, microsecond=0)
+            if not hourly:
+                bucket = bucket.replace(hour=0)
+            buckets.setdefault(bucket, []).append(snapshot_id)
+        rows = []
+        for bucket, ids in sorted(buckets.items()):
+            appended = 1000 * len(ids)
+            total = stats["rows"] - 1000 * (stats["snapshot_id"] - ids[-1])
+            rows.append((bucket, len(ids), ids[-1], found is not None, appended, 0, len(ids), 0, appended * 100, 0,
+                         total, stats["files"], stats["bytes"]))
+        return rows
+
+    def _partitions(self, stats, detailed):
+        count = self.warehouse.partitions_per_table
+        rows = []
+        for index in range(count):
+            partition = NamedRowTuple([f"region_{index}"], ["region"], ["varchar"])
+            files = max(1, stats["files"] // count)
+            size = stats["bytes"] // count
+            small = files // 3
+            if detailed:
+                rows.append((partition, files, size, stats["rows"] // count, small, 1, 0, 4096, 10,
+                             small, files - small, 0, 0, 0, 0))
+            else:
+                rows.append((partition, files, small, 1, size))
+        return rows
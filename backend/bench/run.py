@@ -0,0 +1,176 @@
+"""Offline load benchmark for the backend routes against a simulated Trino.
+
+Run from backend/:
+
+    python -m bench.run --concurrency 32 --requests 500 --latency-ms 20
+
+Every route is driven in-process through the ASGI app, with the connection
+pool's factory swapped for bench.fake_trino. No network or Trino server is
+needed, and the synthetic warehouse is deterministic, so runs are
+comparable across commits. Use --cold to clear the metadata cache before
+every request and measure the uncached path, or --revalidate to send the
+last ETag seen for a URL as If-None-Match, as a browser would.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+# Background collectors would talk to the fake server and skew the numbers
+os.environ.setdefault("METADATA_CRAWLER_ENABLED", "false")
+os.environ.setdefault("QUERY_STATS_ENABLED", "false")
+
+import httpx
+
+from app.core.cache import metadata_cache
+from app.core.health import health_monitor
+from app.core.metrics import InstrumentedConnection
+from app.core.trino_client import TRINO_SERVERS, connection_pool, server_label
+from bench.fake_trino import FakeTrino, SyntheticWarehouse
+
+import main
+
+SERVER = next(iter(TRINO_SERVERS))
+
+# Route name -> URL template; catalog/schema/table are drawn at random per request
+ROUTES = {
+    "catalogs": "/catalogs?server={server}",
+    "schemas": "/schemas?server={server}&catalog={catalog}&limit=200",
+    "tables": "/tables?server={server}&catalog={catalog}&schema={schema}",
+    "metadata": "/metadata?server={server}&catalog={catalog}&schema={schema}&table={table}",
+    "statistics": "/statistics?server={server}&catalog={catalog}&schema={schema}&table={table}",
+    "snapshots": "/snapshots?server={server}&catalog={catalog}&schema={schema}&table={table}",
+    "timeline": "/snapshots/timeline?server={server}&catalog={catalog}&schema={schema}&table={table}",
+    "manifests": "/manifests?server={server}&catalog={catalog}&schema={schema}&table={table}",
+    "ddl": "/ddl?server={server}&catalog={catalog}&schema={schema}&table={table}",
+    "details": "/tables/{catalog}/{schema}/{table}/details?server={server}",
+    "servers": "/trino-servers",
+}
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def install(backend):
+    connection_pool._connection_factory = lambda **kwargs: InstrumentedConnection(
+        backend.connect(**kwargs), server_label(kwargs["host"], kwargs["port"])
+    )
+    health_monitor._probe = lambda server: len(backend.warehouse.catalogs)
+    health_monitor.check_all()
+    health_monitor._first_cycle.set()
+
+
+async def run_route(client, route, warehouse, args, rng):
+    template = ROUTES[route]
+    latencies, errors, statuses = [], 0, {}
+    etags = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        nonlocal errors
+        url = template.format(
+            server=SERVER,
+            catalog=rng.choice(warehouse.catalogs),
+            schema=rng.choice(warehouse.schemas),
+            table=rng.choice(warehouse.tables),
+        )
+        async with semaphore:
+            if args.cold:
+                metadata_cache.clear()
+            headers = {"If-None-Match": etags[url]} if args.revalidate and url in etags else {}
+            started = time.perf_counter()
+            try:
+                response = await client.get(url, headers=headers)
+                if "etag" in response.headers:
+                    etags[url] = response.headers["etag"]
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception as e:
+                errors += 1
+                statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "route": route,
+        "requests": args.requests,
+        "errors": errors,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "max_ms": round(latencies[-1], 1),
+    }
+
+
+async def run(args):
+    warehouse = SyntheticWarehouse(
+        catalogs=args.catalogs,
+        schemas_per_catalog=args.schemas,
+        tables_per_schema=args.tables,
+    )
+    backend = FakeTrino(warehouse, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+    install(backend)
+    rng = random.Random(args.seed)
+
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for route in args.routes:
+            metadata_cache.clear()
+            statements_before = backend.statements
+            result = await run_route(client, route, warehouse, args, rng)
+            result["trino_statements"] = backend.statements - statements_before
+            results.append(result)
+            print(f"{route:<11} {result['throughput_rps']:>9} req/s  p50 {result['p50_ms']:>8} ms  "
+                  f"p95 {result['p95_ms']:>8} ms  max {result['max_ms']:>8} ms  "
+                  f"errors {result['errors']:>4}  statements {result['trino_statements']}", file=sys.stderr)
+
+    if backend.unknown:
+        print(f"[WARN] Fake Trino could not answer: {sorted(backend.unknown)}", file=sys.stderr)
+    return {
+        "config": {key: value for key, value in vars(args).items()},
+        "tables": warehouse.table_count,
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", nargs="+", default=list(ROUTES), choices=list(ROUTES))
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--catalogs", type=int, default=3)
+    parser.add_argument("--schemas", type=int, default=1000, help="schemas per catalog")
+    parser.add_argument("--tables", type=int, default=50, help="tables per schema")
+    parser.add_argument("--latency-ms", type=float, default=20, help="simulated latency per statement")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--cold", action="store_true", help="clear the metadata cache before every request")
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match with the last ETag per URL")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON to PATH")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main_cli()
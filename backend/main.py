@@ -1,13 +1,115 @@
-from fastapi import FastAPI
+import json
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+
+from app.api.routes import servers, catalogs, schemas, tables, metadata, actions, ddl, snapshots, statistics, manifests, details, cache, diagnostics, search, jobs, metrics
+from app.core.trino_client import connection_pool
+from app.core.deadlines import CLIENT_DISCONNECT, DEADLINE, CancelOnDisconnectMiddleware, QueryCancelled, current_scope
+from app.core.executor import TrinoOverloaded, shutdown_executors
+from app.core.responses import GZIP_MINIMUM_SIZE
+from app.core.health import health_monitor
+from app.core.jobs import job_scheduler
+from app.core.metrics import http_request_duration, http_request_errors, trino_statements_per_request
+from app.core.tracing import REQUEST_TRACE_DEBUG_ENABLED, start_trace
+from app.core.metadata_index import METADATA_CRAWLER_ENABLED, metadata_index
+from app.core.query_stats import QUERY_STATS_ENABLED, query_stats
+from app.core.row_counts import row_counter
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health_monitor.start()
+    if METADATA_CRAWLER_ENABLED:
+        metadata_index.start()
+    if QUERY_STATS_ENABLED:
+        query_stats.start()
+    yield
+    job_scheduler.shutdown()
+    row_counter.shutdown()
+    query_stats.stop()
+    metadata_index.stop()
+    health_monitor.stop()
+    shutdown_executors()
+    connection_pool.close_all()
+
+
+app = FastAPI(lifespan=lifespan)
+
 
-from app.api.routes import servers, catalogs, schemas, tables, metadata, actions, ddl, snapshots, statistics
+@app.exception_handler(TrinoOverloaded)
+async def trino_overloaded_handler(request: Request, exc: TrinoOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 
+@app.exception_handler(QueryCancelled)
+async def query_cancelled_handler(request: Request, exc: QueryCancelled):
+    # 499 (client closed request) is only logged; nobody is left to read it
+    return JSONResponse(
+        status_code=504 if exc.reason == DEADLINE else 499,
+        content={"detail": str(exc), "cancelled": exc.reason}
+    )
 
 
+def trace_requested(request: Request):
+    return REQUEST_TRACE_DEBUG_ENABLED and (
+        request.query_params.get("trace") in ("1", "true") or request.headers.get("X-Debug-Trace") in ("1", "true")
+    )
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    trace = start_trace()
+    started = time.monotonic()
+    status = 500
+    try:
+        response = await call_next(request)
+        query_scope = current_scope()
+        if query_scope is not None and query_scope.cancellations:
+            response.headers["X-Trino-Cancelled"] = ", ".join(
+                f"{reason};count={count}" for reason, count in sorted(query_scope.cancellations.items())
+            )
+            # Handlers turn Trino errors into 500s; a statement cut off at its deadline is a timeout
+            if response.status_code == 500 and DEADLINE in query_scope.cancellations:
+                response.status_code = 504
+            elif CLIENT_DISCONNECT in query_scope.cancellations:
+                response.status_code = 499
+        status = response.status_code
+        total_ms = (time.monotonic() - started) * 1000
+        response.headers["Server-Timing"] = trace.server_timing(total_ms, include_sql=REQUEST_TRACE_DEBUG_ENABLED)
+        if trace_requested(request) and response.headers.get("content-type", "").startswith("application/json"):
+            response = await with_trace_block(response, trace.as_dict(total_ms))
+        return response
+    finally:
+        # Label by route template so /tables/{catalog}/... is one series
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        http_request_duration.observe(time.monotonic() - started, method=request.method, route=path, status=str(status))
+        trino_statements_per_request.observe(trace.statement_count(), route=path)
+        if status >= 500:
+            http_request_errors.inc(route=path, status=str(status))
+
+
+async def with_trace_block(response, trace):
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    payload = json.loads(body)
+    # Objects get a "_trace" key; anything else is wrapped to keep valid JSON
+    if isinstance(payload, dict):
+        payload["_trace"] = trace
+    else:
+        payload = {"data": payload, "_trace": trace}
+    headers = {key: value for key, value in response.headers.items() if key.lower() != "content-length"}
+    return JSONResponse(payload, status_code=response.status_code, headers=headers)
+
 
-app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -16,12 +118,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outside the metrics middleware, which reads (uncompressed) JSON bodies for ?trace=1
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+# Outermost, so the query scope covers every other middleware and handler
+app.add_middleware(CancelOnDisconnectMiddleware)
+
 app.include_router(servers.router)
 app.include_router(catalogs.router)
 app.include_router(schemas.router)
 app.include_router(tables.router)
+app.include_router(details.router)
 app.include_router(ddl.router)
 app.include_router(metadata.router)
 app.include_router(snapshots.router)
 app.include_router(statistics.router)
+app.include_router(manifests.router)
 app.include_router(actions.router)
+app.include_router(cache.router)
+app.include_router(diagnostics.router)
+app.include_router(search.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)